@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+import re
+import time
+import zipfile
+
+ARCHIVE_MANIFEST_NAME = "manifest.json"
+
+# Members that are zip files already gain nothing from being deflated a second time
+STORED_EXTENSIONS = (".docx",)
+
+_DRIVE = re.compile(r"[A-Za-z]:")
+
+
+class ArchiveWriter:
+    """Writes rendered documents into a single .zip, one member per document, as they are added.
+
+    Each add() writes its document straight into the archive, so memory holds only the documents
+    not yet added. On close, a manifest.json listing every member with its size and SHA-256 (and
+    any failures recorded with add_error) is written inside the archive. The archive is written to
+    archive_path + ".partial" and moved into place on close, so an interrupted run never leaves a
+    partial zip under the final name.
+    """
+
+    def __init__(self, archive_path, compresslevel=None):
+        self.archive_path = archive_path
+        self.compresslevel = compresslevel
+        self._temporary_path = archive_path + ".partial"
+        self._zip = zipfile.ZipFile(self._temporary_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=compresslevel)
+        self.documents = []
+        self.errors = []
+        self._names = {ARCHIVE_MANIFEST_NAME}
+
+    def add(self, name, data, **info):
+        """Writes one document as member name, with info (e.g. the batch row) kept in the manifest.
+
+        name must be a relative path without ".." components, so unpacking the archive can never write
+        outside the target directory. Raises ValueError if it is not, or if the archive already holds
+        a member with that name.
+        """
+        parts = name.replace(os.sep, "/").replace("\\", "/").split("/")
+        if not name or name.startswith(("/", "\\")) or _DRIVE.match(name) or ".." in parts:
+            raise ValueError(f"Archive member name '{name}' must be a relative path without '..'.")
+        name = "/".join(part for part in parts if part not in ("", "."))
+        if name in self._names:
+            raise ValueError(f"The archive already contains '{name}'.")
+        member = zipfile.ZipInfo(name, time.localtime()[:6])
+        member.compress_type = zipfile.ZIP_STORED if name.endswith(STORED_EXTENSIONS) else zipfile.ZIP_DEFLATED
+        self._zip.writestr(member, data, compresslevel=self.compresslevel)
+        self._names.add(name)
+        self.documents.append({"name": name, "size": len(data), "sha256": hashlib.sha256(data).hexdigest(), **info})
+
+    def add_error(self, name, error, **info):
+        """Records in the manifest a document that could not be rendered."""
+        self.errors.append({"name": name, "error": error, **info})
+
+    def close(self):
+        """Writes the manifest and moves the finished archive to archive_path."""
+        manifest = {"documents": self.documents, "errors": self.errors}
+        self._zip.writestr(ARCHIVE_MANIFEST_NAME, json.dumps(manifest, indent=1))
+        self._zip.close()
+        os.replace(self._temporary_path, self.archive_path)
+
+    def discard(self):
+        """Abandons the archive, removing the partial file."""
+        self._zip.close()
+        os.remove(self._temporary_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+        return False
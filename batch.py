@@ -0,0 +1,254 @@
+import csv
+import io
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import tracing
+from manifest import BuildManifest, input_digest
+from utils import generate_document, output_paths
+
+REPORT_FIELDS = ["row", "outputFilePath", "status", "error"]
+
+# Rendered documents waiting to be written into an archive, per worker; bounds the memory used
+PENDING_PER_WORKER = 4
+
+
+def load_rows(rows_path):
+    """Loads placeholder rows from a .csv file (header row required) or a .jsonl file (one object per line)."""
+    if rows_path.endswith(".csv"):
+        rows = []
+        with open(rows_path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                # DictReader files cells beyond the header under the None key
+                if None in row:
+                    raise ValueError(f"Line {reader.line_num} of '{rows_path}' has more cells than the header.")
+                rows.append(row)
+        return rows
+    elif rows_path.endswith((".jsonl", ".ndjson")):
+        rows = []
+        with open(rows_path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                if not isinstance(row, dict):
+                    raise ValueError(f"Line {line_number} of '{rows_path}' is not a JSON object.")
+                rows.append(row)
+        return rows
+    else:
+        raise ValueError("Unsupported rows file type. Please use .csv or .jsonl.")
+
+
+def row_output_path(base_output_path, row, index):
+    """Works out where a row is written.
+
+    A row may name its own outputFilePath. Otherwise the base config's outputFilePath is used as a
+    pattern: {Field} references are filled from the row, or the row number is appended to the name.
+    Raises ValueError if the pattern refers to a field the row does not have.
+    """
+    if row.get("outputFilePath"):
+        return row["outputFilePath"]
+    if "{" in base_output_path:
+        try:
+            return base_output_path.format_map({**row, "row": index})
+        except KeyError as e:
+            raise ValueError(f"Output path '{base_output_path}' uses {{{e.args[0]}}}, which the row does not fill in.")
+        except (IndexError, ValueError) as e:
+            raise ValueError(f"Invalid output path pattern '{base_output_path}': {e}")
+    stem, extension = os.path.splitext(base_output_path)
+    return f"{stem}-{index}{extension}"
+
+
+def build_row_config(base_config, row, index):
+    """Builds the generate_document config for one row on top of the base config."""
+    placeholders = dict(base_config.get("placeholders") or {})
+    for key, value in row.items():
+        if key != "outputFilePath":
+            placeholders[key] = "" if value is None else str(value)
+    config = dict(base_config)
+    config["placeholders"] = placeholders
+    config["outputFilePath"] = row_output_path(base_config.get("outputFilePath", "output.docx"), row, index)
+    return config
+
+
+def _render_row(task):
+    """Renders one row in a worker process; errors are reported rather than raised."""
+    index, config, bookend = task
+    try:
+        # The parent process owns the build manifests, so workers never write them concurrently
+        generate_document(config, bookend=bookend, interactive=False, incremental=False)
+        return {"row": index, "outputFilePath": config["outputFilePath"], "status": "ok", "error": ""}
+    except Exception as e:
+        return {"row": index, "outputFilePath": config.get("outputFilePath"), "status": "error", "error": str(e)}
+
+
+def _render_row_to_memory(task):
+    """Renders one row into memory in a worker process, returning its result and the document bytes."""
+    index, config, bookend = task
+    buffer = io.BytesIO()
+    try:
+        generate_document(config, bookend=bookend, interactive=False, target=buffer)
+        return {"row": index, "outputFilePath": config["outputFilePath"], "status": "ok", "error": ""}, \
+            buffer.getvalue()
+    except Exception as e:
+        return {"row": index, "outputFilePath": config.get("outputFilePath"), "status": "error", "error": str(e)}, None
+
+
+def _as_completed_bounded(executor, function, tasks, limit):
+    """Yields function(task) results as they finish, never keeping more than limit tasks in flight."""
+    tasks = iter(tasks)
+    pending = set()
+    while True:
+        for task in tasks:
+            pending.add(executor.submit(function, task))
+            if len(pending) >= limit:
+                break
+        if not pending:
+            return
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
+
+
+def _archive_member_name(output_path, base_directory):
+    """Names an output's archive member relative to the base output directory, keeping host paths out of the zip.
+
+    Raises ValueError for outputs outside that directory.
+    """
+    try:
+        name = os.path.relpath(os.path.abspath(output_path), base_directory)
+    except ValueError:
+        # On another drive than the base directory (Windows)
+        name = os.pardir
+    if name == os.pardir or name.startswith(os.pardir + os.sep):
+        raise ValueError(f"Output '{output_path}' is outside the base config's output directory, "
+                         f"so it cannot be named in the archive.")
+    return name
+
+
+def _run_batch_to_archive(tasks, archive_path, workers, results, base_directory):
+    """Renders every task in memory and writes each document into archive_path as soon as it is ready.
+
+    results already holds the rows that failed before rendering; they are recorded in the archive too.
+    Members are named relative to base_directory; outputs outside it are reported as errors.
+    """
+    from archive import ArchiveWriter
+    with ArchiveWriter(archive_path) as archive:
+        for result in results.values():
+            archive.add_error(os.path.basename(result["outputFilePath"] or ""), result["error"], row=result["row"])
+        if workers == 1 or len(tasks) <= 1:
+            rendered = map(_render_row_to_memory, tasks)
+            executor = None
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=tracing.pool_initializer())
+            rendered = map(tracing.from_workers, _as_completed_bounded(
+                executor, tracing.for_workers(_render_row_to_memory), tasks, workers * PENDING_PER_WORKER))
+        try:
+            for result, data in rendered:
+                try:
+                    name = _archive_member_name(result["outputFilePath"], base_directory)
+                except ValueError as e:
+                    name = os.path.basename(result["outputFilePath"])
+                    if data is not None:
+                        result.update(status="error", error=str(e))
+                        data = None
+                if data is not None:
+                    try:
+                        archive.add(name, data, row=result["row"])
+                    except ValueError as e:
+                        result.update(status="error", error=str(e))
+                if result["status"] == "error":
+                    archive.add_error(name, result["error"], row=result["row"])
+                results[result["row"]] = result
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+
+def run_batch(base_config, rows_path, workers=None, bookend="%", incremental=True, force=False, archive_path=None):
+    """Renders one output per row of rows_path in a process pool and returns a result per row.
+
+    Rows are numbered from 1. Nothing is ever prompted for: existing outputs are only replaced when
+    the base config sets overwriteOutput, or with incremental when the build manifest shows they
+    were built by this tool and not edited since. With incremental, rows whose output is up to date
+    in its build manifest are reported as "skipped" without being rendered; force renders every row
+    but still records the results in the manifests.
+
+    With archive_path, no output files are written: each row is rendered in memory and added to that
+    .zip as soon as it is ready, named by its output path relative to the base config's output
+    directory, and every row is rendered. The archive holds a manifest.json of its documents and
+    failed rows. Raises ValueError if the base config lists extra outputs, which need one file each.
+    """
+    rows = load_rows(rows_path)
+    results = {}
+    tasks = []
+    for index, row in enumerate(rows, start=1):
+        try:
+            tasks.append((index, build_row_config(base_config, row, index), bookend))
+        except ValueError as e:
+            output_path = row.get("outputFilePath") or base_config.get("outputFilePath")
+            results[index] = {"row": index, "outputFilePath": output_path, "status": "error", "error": str(e)}
+    workers = workers or os.cpu_count() or 1
+    if archive_path is not None:
+        if base_config.get("outputs"):
+            raise ValueError("A batch with extra outputs cannot be written to an archive; remove outputs or --archive.")
+        if os.path.exists(archive_path) and not base_config.get("overwriteOutput", False):
+            raise FileExistsError(f"Archive '{archive_path}' already exists and overwrite is not allowed.")
+        base_directory = os.path.dirname(os.path.abspath(base_config.get("outputFilePath", "output.docx")))
+        _run_batch_to_archive(tasks, archive_path, workers, results, base_directory)
+        return [results[index] for index in range(1, len(rows) + 1)]
+    digests = {}
+    manifests = {}
+    if incremental:
+        for index, config, _ in tasks:
+            output_path = config["outputFilePath"]
+            try:
+                digest = input_digest(config, bookend)
+                paths = output_paths(config)
+            except (OSError, ValueError, TypeError) as e:
+                results[index] = {"row": index, "outputFilePath": output_path, "status": "error", "error": str(e)}
+                continue
+            directory = os.path.dirname(os.path.abspath(output_path))
+            manifest = manifests.get(directory)
+            if manifest is None:
+                manifest = manifests[directory] = BuildManifest(directory)
+            if not force and all(manifest.is_up_to_date(path, digest) for path in paths):
+                results[index] = {"row": index, "outputFilePath": output_path, "status": "skipped", "error": ""}
+            else:
+                digests[index] = (manifest, digest, paths)
+                # Workers do not see the manifest, so stale outputs this tool built are marked replaceable here
+                if all(manifest.is_unmodified(path) or not os.path.exists(path) for path in paths):
+                    config["overwriteOutput"] = True
+    pending = [task for task in tasks if task[0] not in results]
+
+    if workers == 1 or len(pending) <= 1:
+        rendered = [_render_row(task) for task in pending]
+    else:
+        # Rows sharing a worker reuse its compiled template, so hand them out in chunks
+        chunksize = max(1, len(pending) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=tracing.pool_initializer()) as executor:
+            rendered = [tracing.from_workers(result) for result in
+                        executor.map(tracing.for_workers(_render_row), pending, chunksize=chunksize)]
+
+    for result in rendered:
+        results[result["row"]] = result
+        if result["status"] == "ok" and result["row"] in digests:
+            manifest, digest, paths = digests[result["row"]]
+            for path in paths:
+                manifest.record(path, digest)
+    for manifest in manifests.values():
+        manifest.save()
+    return [results[index] for index in range(1, len(rows) + 1)]
+
+
+def write_report(results, report_path):
+    """Writes the per-row results as a .csv or .jsonl report."""
+    with open(report_path, 'w', encoding='utf-8', newline='') as f:
+        if report_path.endswith((".jsonl", ".ndjson")):
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+        else:
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
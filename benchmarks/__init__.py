@@ -0,0 +1,4 @@
+"""Offline benchmarks for the document generation hot paths.
+
+Run ``python -m benchmarks --help`` from the repository root.
+"""
@@ -0,0 +1,40 @@
+import argparse
+import os
+import sys
+
+# Benchmarks import the top-level modules (utils, templates...) from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.runner import (FULL_MATRIX, QUICK_MATRIX, build_cases, compare, load_results, run_benchmarks,
+                               save_results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark generate_document, extract_placeholders and load_config "
+                                                 "on synthetic templates.", prog="python -m benchmarks")
+    parser.add_argument("--full", action="store_true", help="Run the full size matrix instead of the quick one")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per function and case [Default is 20]")
+    parser.add_argument("--filter", help="Only run cases whose id contains this text (e.g. docx-p500)")
+    parser.add_argument("--out", default="bench-results.json", help="Where to save the JSON results")
+    parser.add_argument("--compare", help="Baseline JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative p50 slowdown reported as a regression [Default is 0.10]")
+    args = parser.parse_args()
+
+    cases = build_cases(FULL_MATRIX if args.full else QUICK_MATRIX)
+    if args.filter:
+        cases = [case for case in cases if args.filter in case["id"]]
+    results = run_benchmarks(cases, repeat=args.repeat)
+    save_results(results, args.out)
+    print(f"Results saved to '{args.out}'.")
+
+    if args.compare:
+        lines, regressions = compare(results, load_results(args.compare), args.threshold)
+        print("\n".join(lines))
+        print(f"{regressions} regression(s) above {args.threshold:.0%}.")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from benchmarks import synth
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+QUICK_MATRIX = {
+    "kind": ["txt", "docx"],
+    "paragraphs": [50, 500],
+    "placeholders": [10, 60],
+    "density": [0.5],
+    "images": [0, 4],
+}
+
+FULL_MATRIX = {
+    "kind": ["txt", "docx"],
+    "paragraphs": [50, 500, 5000],
+    "placeholders": [10, 60],
+    "density": [0.1, 0.5, 1.0],
+    "images": [0, 4, 16],
+}
+
+
+def build_cases(matrix):
+    """Expands a parameter matrix into benchmark cases; images only apply to .docx."""
+    cases = []
+    for kind in matrix["kind"]:
+        for paragraphs in matrix["paragraphs"]:
+            for placeholders in matrix["placeholders"]:
+                for density in matrix["density"]:
+                    for images in (matrix["images"] if kind == "docx" else [0]):
+                        case_id = f"{kind}-p{paragraphs}-n{placeholders}-d{density}-i{images}"
+                        cases.append({"id": case_id, "kind": kind, "paragraphs": paragraphs,
+                                      "placeholders": placeholders, "density": density, "images": images})
+    return cases
+
+
+def percentile(samples, fraction):
+    """Returns the given percentile of samples, interpolating between the closest ranks."""
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(samples, size_bytes):
+    """Summarizes latency samples (seconds) as milliseconds, throughput and bytes per second."""
+    mean = statistics.fmean(samples)
+    return {
+        "runs": len(samples),
+        "mean_ms": mean * 1000,
+        "p50_ms": percentile(samples, 0.50) * 1000,
+        "p90_ms": percentile(samples, 0.90) * 1000,
+        "p99_ms": percentile(samples, 0.99) * 1000,
+        "ops_per_s": 1 / mean if mean else None,
+        "mb_per_s": size_bytes / mean / 1e6 if mean else None,
+    }
+
+
+def _time(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def peak_rss_bytes():
+    """Returns the peak resident set size of this process, or None where it cannot be measured."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_case(case, repeat, workdir):
+    """Builds the synthetic inputs for one case and times the hot paths against them."""
+    from utils import extract_placeholders, generate_document, load_config
+    template_path = os.path.join(workdir, f"{case['id']}.{case['kind']}")
+    if case["kind"] == "docx":
+        synth.write_docx_template(template_path, case["paragraphs"], case["placeholders"], case["density"],
+                                  case["images"])
+    else:
+        synth.write_txt_template(template_path, case["paragraphs"], case["placeholders"], case["density"])
+    output_path = os.path.join(workdir, f"{case['id']}-out.{case['kind']}")
+    config_path = synth.write_config(os.path.join(workdir, f"{case['id']}-config.json"), template_path,
+                                     output_path, case["placeholders"])
+    template_size = os.path.getsize(template_path)
+    config = load_config(config_path)
+
+    # incremental=False throughout: otherwise every call after the first is a build-manifest hit, not a render
+    start = time.perf_counter()
+    generate_document(config, interactive=False, incremental=False)
+    cold = time.perf_counter() - start
+
+    results = {
+        "template_bytes": template_size,
+        "generate_cold_ms": cold * 1000,
+        "generate_document": summarize(
+            _time(lambda: generate_document(config, interactive=False, incremental=False), repeat), template_size),
+        "extract_placeholders": summarize(_time(lambda: extract_placeholders(template_path, "%"), repeat),
+                                          template_size),
+        "load_config": summarize(_time(lambda: load_config(config_path), repeat), os.path.getsize(config_path)),
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+    if case["kind"] == "docx":
+        fast = dict(config, fastDocx=True)
+        results["generate_document_fast_docx"] = summarize(
+            _time(lambda: generate_document(fast, interactive=False, incremental=False), repeat), template_size)
+    return results
+
+
+def _run_case_in_child(arguments):
+    case, repeat = arguments
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        return run_case(case, repeat, workdir)
+
+
+def run_benchmarks(cases, repeat=20, progress=print):
+    """Runs every case in a fresh child process, so peak RSS is measured per case."""
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for case in cases:
+        with context.Pool(1) as pool:
+            measured = pool.apply(_run_case_in_child, ((case, repeat),))
+        results.append({**case, **measured})
+        progress(format_case(results[-1]))
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "cases": results,
+    }
+
+
+def format_case(result):
+    """Formats one case result as a single summary line."""
+    generate = result["generate_document"]
+    rss = result["peak_rss_bytes"]
+    return (f"{result['id']:<36} generate p50 {generate['p50_ms']:8.2f} ms  p99 {generate['p99_ms']:8.2f} ms  "
+            f"{generate['ops_per_s']:8.1f}/s  extract p50 {result['extract_placeholders']['p50_ms']:7.2f} ms  "
+            f"load_config p50 {result['load_config']['p50_ms']:6.3f} ms  "
+            f"rss {rss / 1e6 if rss else float('nan'):6.1f} MB")
+
+
+def compare(current, baseline, threshold=0.10):
+    """Compares p50 latencies with a baseline run and returns (lines, regressions)."""
+    previous = {case["id"]: case for case in baseline["cases"]}
+    metrics = ("generate_document", "generate_document_fast_docx", "extract_placeholders", "load_config")
+    lines = []
+    regressions = 0
+    for case in current["cases"]:
+        old = previous.get(case["id"])
+        if old is None:
+            lines.append(f"{case['id']:<36} (no baseline)")
+            continue
+        for metric in metrics:
+            if metric not in case or metric not in old:
+                continue
+            before, after = old[metric]["p50_ms"], case[metric]["p50_ms"]
+            change = (after - before) / before if before else 0.0
+            flag = ""
+            if change > threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            lines.append(f"{case['id']:<36} {metric:<28} {before:9.3f} -> {after:9.3f} ms  {change:+7.1%}{flag}")
+    return lines, regressions
+
+
+def save_results(results, path):
+    """Saves results as JSON for a later --compare."""
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path):
+    """Loads results saved by save_results."""
+    with open(path, 'r') as f:
+        return json.load(f)
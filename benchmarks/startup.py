@@ -0,0 +1,114 @@
+"""Cold-start benchmark for the main.py command-line modes, based on ``python -X importtime``.
+
+Run ``python -m benchmarks.startup`` from the repository root. Each mode is run end to end on
+synthetic inputs; the run fails if a mode imports a module it should not need (for example the
+GUI toolkit on a non-GUI path, or python-docx on a .txt-only render).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(REPOSITORY, "main.py")
+
+GUI_MODULES = ("tkinter", "gui", "run_gui")
+DOCX_MODULES = ("docx", "lxml")
+
+
+def _modes(workdir):
+    """Returns (name, arguments, stdin, forbidden top-level modules) for each CLI mode."""
+    from benchmarks import synth
+    txt_template = synth.write_txt_template(os.path.join(workdir, "template.txt"), 200, 20, 0.5)
+    docx_template = synth.write_docx_template(os.path.join(workdir, "Company-Role-template.docx"), 200, 20, 0.5)
+    txt_config = synth.write_config(os.path.join(workdir, "txt-config.json"), txt_template,
+                                    os.path.join(workdir, "out.txt"), 20)
+    rows_path = os.path.join(workdir, "rows.jsonl")
+    with open(rows_path, 'w') as f:
+        for index in range(4):
+            f.write(json.dumps({"Field0": f"row {index}"}) + "\n")
+    return [
+        ("help", ["-h"], "", GUI_MODULES + DOCX_MODULES + ("sqlite3",)),
+        ("config-txt", ["--config", txt_config, "--force"], "n\ny\n", GUI_MODULES + DOCX_MODULES),
+        ("batch-txt", ["--config", txt_config, "--batch", rows_path, "--workers", "1", "--force"], "",
+         GUI_MODULES + DOCX_MODULES),
+        ("index", ["--index", workdir], "", GUI_MODULES + ("docx",)),
+        ("build-docx", ["-BUILD", docx_template, "--force"], "%\nn\ny\ny\n", GUI_MODULES),
+    ]
+
+
+def parse_importtime(stderr):
+    """Parses -X importtime output into (total self time in microseconds, {module: cumulative microseconds})."""
+    total = 0
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        total += int(self_us)
+        modules[name.strip()] = int(cumulative_us)
+    return total, modules
+
+
+def measure(arguments, stdin, cwd, runs):
+    """Runs main.py with -X importtime and returns (wall times, import total, modules) of the fastest run."""
+    best = None
+    walls = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        process = subprocess.run([sys.executable, "-X", "importtime", MAIN] + arguments, input=stdin, cwd=cwd,
+                                 capture_output=True, text=True)
+        wall = time.perf_counter() - start
+        walls.append(wall)
+        total, modules = parse_importtime(process.stderr)
+        if best is None or wall < best[0]:
+            best = (wall, total, modules, process.returncode)
+    return walls, best[1], best[2], best[3]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start time of each main.py mode.",
+                                     prog="python -m benchmarks.startup")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per mode [Default is 5]")
+    parser.add_argument("--top", type=int, default=5, help="Slowest imports to show per mode [Default is 5]")
+    parser.add_argument("--budget-ms", type=float, help="Fail if a mode's median wall time exceeds this")
+    parser.add_argument("--out", help="Save the results as JSON")
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPOSITORY)
+    failures = 0
+    results = []
+    with tempfile.TemporaryDirectory(prefix="startup-") as workdir:
+        for name, arguments, stdin, forbidden in _modes(workdir):
+            walls, import_us, modules, returncode = measure(arguments, stdin, workdir, args.runs)
+            median_ms = statistics.median(walls) * 1000
+            loaded = sorted({module for module in modules if module.split(".")[0] in forbidden})
+            print(f"{name:<12} median {median_ms:7.1f} ms  min {min(walls) * 1000:7.1f} ms  "
+                  f"imports {import_us / 1000:6.1f} ms  ({len(modules)} modules, exit {returncode})")
+            top_level = sorted(((cumulative, module) for module, cumulative in modules.items() if "." not in module),
+                               reverse=True)[:args.top]
+            for cumulative, module in top_level:
+                print(f"{'':<14}{module:<28}{cumulative / 1000:7.1f} ms")
+            if returncode != 0:
+                print(f"{'':<14}FAIL: exited with {returncode}")
+                failures += 1
+            if loaded:
+                print(f"{'':<14}FAIL: imports {', '.join(loaded[:5])}{' ...' if len(loaded) > 5 else ''}")
+                failures += 1
+            if args.budget_ms is not None and median_ms > args.budget_ms:
+                print(f"{'':<14}FAIL: over the {args.budget_ms:.0f} ms budget")
+                failures += 1
+            results.append({"mode": name, "median_ms": median_ms, "min_ms": min(walls) * 1000,
+                            "import_ms": import_us / 1000, "modules": len(modules), "unexpected": loaded})
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
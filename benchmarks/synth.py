@@ -0,0 +1,94 @@
+import json
+import os
+import random
+import struct
+import zlib
+
+WORDS = ("experience", "team", "product", "delivered", "customers", "growth", "role", "skills", "platform",
+         "impact", "design", "data", "led", "built", "improved", "results", "company", "mission")
+
+
+def placeholder_names(count):
+    """Returns count distinct placeholder names."""
+    return [f"Field{index}" for index in range(count)]
+
+
+def _sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def paragraph_texts(paragraphs, placeholders, density, bookend="%", seed=0):
+    """Returns paragraph texts in which roughly density of the paragraphs carry a placeholder."""
+    rng = random.Random(seed)
+    names = placeholder_names(placeholders)
+    texts = []
+    for index in range(paragraphs):
+        text = _sentence(rng)
+        if names and rng.random() < density:
+            # Walk the names in order so every placeholder appears at least once when there is room
+            name = names[index % len(names)]
+            words = text.split(" ")
+            words.insert(rng.randrange(len(words) + 1), f"{bookend}{name}{bookend}")
+            text = " ".join(words)
+        texts.append(text)
+    return texts
+
+
+def png_bytes(size=64, seed=0):
+    """Returns a size x size RGB PNG of noise, so it does not compress away."""
+    rng = random.Random(seed)
+    rows = b"".join(b"\x00" + bytes(rng.getrandbits(8) for _ in range(size * 3)) for _ in range(size))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b"")
+
+
+def write_txt_template(path, paragraphs, placeholders, density, bookend="%", seed=0):
+    """Writes a synthetic .txt template with one paragraph per line."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(paragraph_texts(paragraphs, placeholders, density, bookend, seed)))
+    return path
+
+
+def write_docx_template(path, paragraphs, placeholders, density, images=0, bookend="%", seed=0):
+    """Writes a synthetic .docx template, splitting every other placeholder across two runs like Word does."""
+    from docx import Document
+    from docx.shared import Inches
+    document = Document()
+    image_path = path + ".png"
+    if images:
+        with open(image_path, 'wb') as f:
+            f.write(png_bytes(seed=seed))
+    texts = paragraph_texts(paragraphs, placeholders, density, bookend, seed)
+    image_every = max(1, len(texts) // images) if images else 0
+    for index, text in enumerate(texts):
+        paragraph = document.add_paragraph()
+        split = text.find(bookend)
+        if split >= 0 and index % 2:
+            paragraph.add_run(text[:split + len(bookend) + 2])
+            paragraph.add_run(text[split + len(bookend) + 2:]).bold = True
+        else:
+            paragraph.add_run(text)
+        if images and index % image_every == 0 and index // image_every < images:
+            document.add_picture(image_path, width=Inches(1))
+    document.save(path)
+    if images:
+        os.remove(image_path)
+    return path
+
+
+def write_config(path, template_path, output_path, placeholders, bookend="%"):
+    """Writes a config filling every synthetic placeholder."""
+    config = {
+        "templateFilePath": template_path,
+        "outputFilePath": output_path,
+        "overwriteOutput": True,
+        "bookends": bookend,
+        "placeholders": {name: f"value of {name}" for name in placeholder_names(placeholders)},
+    }
+    with open(path, 'w') as f:
+        json.dump(config, f, indent=4)
+    return path
@@ -0,0 +1,74 @@
+import re
+from bisect import bisect_right
+from substitution import placeholder_regex
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+W_P = W_NS + "p"
+W_T = W_NS + "t"
+XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+TEXT_PART_PATTERN = re.compile(r"word/(document|header\d*|footer\d*)\.xml")
+
+
+def is_text_part(name):
+    """Returns True for the parts of a .docx package that hold document text."""
+    return TEXT_PART_PATTERN.fullmatch(name) is not None
+
+
+def text_nodes(paragraph):
+    """Returns the w:t nodes belonging to a paragraph element, excluding those of nested text box paragraphs."""
+    return [node for node in paragraph.iter(W_T) if next(node.iterancestors(W_P), None) is paragraph]
+
+
+def splice_runs(texts, spans):
+    """Applies (start, end, value) spans, given against the joined texts, to the individual run texts.
+
+    A value goes into the run where its token starts, keeping that run's formatting; the rest of a
+    token that spans several runs is cut from the runs that follow. Spans must be sorted and must not
+    overlap. Returns the new list of run texts.
+    """
+    starts = []
+    offset = 0
+    for text in texts:
+        starts.append(offset)
+        offset += len(text)
+    result = list(texts)
+    # Later spans are applied first, so the offsets of earlier ones stay valid
+    for start, end, value in reversed(spans):
+        first = bisect_right(starts, start) - 1
+        last = bisect_right(starts, end - 1) - 1
+        head = result[first][:start - starts[first]] + value
+        if first == last:
+            result[first] = head + result[first][end - starts[first]:]
+        else:
+            result[first] = head
+            for index in range(first + 1, last):
+                result[index] = ""
+            result[last] = result[last][end - starts[last]:]
+    return result
+
+
+def set_text(node, text):
+    """Sets the text of a w:t node, marking it to preserve leading and trailing whitespace."""
+    node.text = text
+    if text and (text[0].isspace() or text[-1].isspace()):
+        node.set(XML_SPACE, "preserve")
+
+
+def substitute_paragraph(paragraph, placeholders, bookend="%"):
+    """Replaces placeholders in one paragraph element by editing only the w:t nodes they touch.
+
+    Paragraphs whose text does not contain the bookend are skipped without further work. Returns the
+    number of placeholders replaced.
+    """
+    nodes = text_nodes(paragraph)
+    texts = [node.text or "" for node in nodes]
+    joined = "".join(texts)
+    if bookend not in joined or not placeholders:
+        return 0
+    pattern = placeholder_regex(frozenset(placeholders), bookend)
+    spans = [(match.start(), match.end(), placeholders[match.group(1)]) for match in pattern.finditer(joined)]
+    if spans:
+        for node, old, new in zip(nodes, texts, splice_runs(texts, spans)):
+            if new != old:
+                set_text(node, new)
+    return len(spans)
@@ -0,0 +1,169 @@
+import contextlib
+import functools
+import os
+import struct
+import zipfile
+import zlib
+from lxml import etree
+from docx_runs import W_P, is_text_part, substitute_paragraph
+from tracing import count, span
+
+COPY_CHUNK_SIZE = 1 << 16
+
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+_CENTRAL_HEADER = struct.Struct("<4s4B4HL2L5H2L")
+_END_RECORD = struct.Struct("<4s4H2LH")
+_ZIP32_LIMIT = 0xFFFFFFFF
+
+# General purpose flag bits 1-2 record the deflate option the member was written with
+_LEVEL_FROM_FLAGS = {0: 6, 1: 9, 2: 1, 3: 1}
+_UTF8_FLAG = 0x800
+_DATA_DESCRIPTOR_FLAG = 0x08
+
+
+@functools.lru_cache(maxsize=32)
+def _read_text_parts(template_path, mtime_ns):
+    with zipfile.ZipFile(template_path) as package:
+        infos = [info for info in package.infolist() if is_text_part(info.filename)]
+        count("bytes_read", sum(info.compress_size for info in infos))
+        return {info.filename: package.read(info) for info in infos}
+
+
+def render_text_part(data, placeholders, bookend="%"):
+    """Substitutes placeholders in one XML text part, returning None when the part is unchanged.
+
+    Parts that do not contain the bookend at all are never parsed.
+    """
+    if bookend.encode('utf-8') not in data:
+        return None
+    root = etree.fromstring(data)
+    replaced = 0
+    for paragraph in root.iter(W_P):
+        replaced += substitute_paragraph(paragraph, placeholders, bookend)
+    count("placeholders_replaced", replaced)
+    if not replaced:
+        return None
+    return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+
+def render_docx_zip(template_path, output_path, placeholders, bookend="%", keep_compression=True, compresslevel=None):
+    """Renders a .docx by rewriting only its text parts at the zip level.
+
+    The document, header and footer XML parts are substituted run by run and recompressed; every
+    other member (images, fonts, styles...), and any text part without a placeholder, is copied
+    byte-for-byte without being decompressed. With keep_compression the rewritten parts reuse the
+    deflate level recorded in the template, otherwise compresslevel is used. output_path may also
+    be a writable, seekable binary file object.
+    """
+    template_path = os.path.abspath(template_path)
+    with span("open_template", path=template_path):
+        text_parts = _read_text_parts(template_path, os.stat(template_path).st_mtime_ns)
+
+    if hasattr(output_path, "write"):
+        _write_package(template_path, text_parts, output_path, placeholders, bookend, keep_compression, compresslevel)
+        return
+    # Written beside the output and moved into place, so a failure never leaves a truncated .docx behind
+    temporary_path = output_path + ".partial"
+    try:
+        with open(temporary_path, 'wb') as target:
+            _write_package(template_path, text_parts, target, placeholders, bookend, keep_compression, compresslevel)
+        os.replace(temporary_path, output_path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(temporary_path)
+        raise
+
+
+def _write_package(template_path, text_parts, target, placeholders, bookend, keep_compression, compresslevel):
+    with zipfile.ZipFile(template_path) as package, open(template_path, 'rb') as source:
+        writer = _ZipWriter(target)
+        copied = 0
+        for info in package.infolist():
+            data = None
+            if info.filename in text_parts:
+                with span("substitute", part=info.filename):
+                    data = render_text_part(text_parts[info.filename], placeholders, bookend)
+            with span("save", part=info.filename):
+                if data is not None:
+                    level = _LEVEL_FROM_FLAGS[(info.flag_bits >> 1) & 3] if keep_compression else compresslevel
+                    writer.write_data(info, data, level)
+                else:
+                    writer.copy_raw(info, source)
+                    copied += info.compress_size
+        writer.close()
+    count("bytes_read", copied)
+
+
+class _ZipWriter:
+    """Minimal zip writer that can append members copied raw from another archive."""
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.entries = []
+
+    def copy_raw(self, info, source):
+        """Copies a member's compressed bytes from the source archive file without decompressing them."""
+        source.seek(info.header_offset)
+        header = _LOCAL_HEADER.unpack(source.read(_LOCAL_HEADER.size))
+        source.seek(info.header_offset + _LOCAL_HEADER.size + header[10] + header[11])
+        flag_bits = info.flag_bits & ~_DATA_DESCRIPTOR_FLAG
+        self._write_header(info, flag_bits, info.compress_type, info.CRC, info.compress_size, info.file_size)
+        remaining = info.compress_size
+        while remaining:
+            chunk = source.read(min(COPY_CHUNK_SIZE, remaining))
+            if not chunk:
+                raise zipfile.BadZipFile(f"Truncated member '{info.filename}' in template.")
+            self.fp.write(chunk)
+            remaining -= len(chunk)
+
+    def write_data(self, info, data, compresslevel=None):
+        """Writes a member with new contents, using the original member's compression method."""
+        flag_bits = info.flag_bits & ~(_DATA_DESCRIPTOR_FLAG | 0x06)
+        if info.compress_type == zipfile.ZIP_DEFLATED:
+            level = zlib.Z_DEFAULT_COMPRESSION if compresslevel is None else compresslevel
+            compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+            payload = compressor.compress(data) + compressor.flush()
+            if level == 9:
+                flag_bits |= 0x02
+            elif level in (1, 2):
+                flag_bits |= 0x04
+        elif info.compress_type == zipfile.ZIP_STORED:
+            payload = data
+        else:
+            raise ValueError(f"Unsupported compression method {info.compress_type} for '{info.filename}'.")
+        self._write_header(info, flag_bits, info.compress_type, zlib.crc32(data), len(payload), len(data))
+        self.fp.write(payload)
+
+    def _write_header(self, info, flag_bits, compress_type, crc, compress_size, file_size):
+        offset = self.fp.tell()
+        if max(offset, compress_size, file_size) > _ZIP32_LIMIT:
+            raise ValueError("Output is too large for the fast .docx writer (zip64 is not supported).")
+        try:
+            filename = info.filename.encode('ascii')
+            flag_bits &= ~_UTF8_FLAG
+        except UnicodeEncodeError:
+            filename = info.filename.encode('utf-8')
+            flag_bits |= _UTF8_FLAG
+        year, month, day, hour, minute, second = info.date_time
+        dos_date = (year - 1980) << 9 | month << 5 | day
+        dos_time = hour << 11 | minute << 5 | second // 2
+        self.fp.write(_LOCAL_HEADER.pack(b"PK\003\004", 20, 0, flag_bits, compress_type, dos_time, dos_date,
+                                         crc, compress_size, file_size, len(filename), 0))
+        self.fp.write(filename)
+        self.entries.append((filename, flag_bits, compress_type, dos_time, dos_date, crc, compress_size,
+                             file_size, info.external_attr, offset))
+
+    def close(self):
+        """Writes the central directory and end-of-archive record."""
+        directory_offset = self.fp.tell()
+        for filename, flag_bits, compress_type, dos_time, dos_date, crc, compress_size, file_size, \
+                external_attr, offset in self.entries:
+            self.fp.write(_CENTRAL_HEADER.pack(b"PK\001\002", 20, 0, 20, 0, flag_bits, compress_type, dos_time,
+                                               dos_date, crc, compress_size, file_size, len(filename), 0, 0, 0, 0,
+                                               external_attr, offset))
+            self.fp.write(filename)
+        directory_size = self.fp.tell() - directory_offset
+        if len(self.entries) > 0xFFFF or directory_offset > _ZIP32_LIMIT:
+            raise ValueError("Output is too large for the fast .docx writer (zip64 is not supported).")
+        self.fp.write(_END_RECORD.pack(b"PK\005\006", 0, 0, len(self.entries), len(self.entries),
+                                       directory_size, directory_offset, 0))
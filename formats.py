@@ -0,0 +1,185 @@
+import os
+import re
+from docx_runs import W_NS, W_P
+
+# Document formats by file extension
+OUTPUT_FORMATS = {".docx": "docx", ".doc": "docx", ".txt": "txt", ".md": "md"}
+
+W_R = W_NS + "r"
+W_RPR = W_NS + "rPr"
+W_PPR = W_NS + "pPr"
+W_PSTYLE = W_NS + "pStyle"
+W_T = W_NS + "t"
+W_TAB = W_NS + "tab"
+W_BR = W_NS + "br"
+W_CR = W_NS + "cr"
+W_TBL = W_NS + "tbl"
+W_TR = W_NS + "tr"
+W_TC = W_NS + "tc"
+W_VAL = W_NS + "val"
+W_B = W_NS + "b"
+W_I = W_NS + "i"
+OFF_VALUES = ("0", "false", "off")
+
+HEADING_STYLE = re.compile(r"Heading(\d)")
+MARKDOWN_ESCAPES = str.maketrans({character: "\\" + character for character in "\\`*_[]|"})
+
+
+def template_format(template_path):
+    """Returns the format a template is in: "docx" for .docx and .doc templates, otherwise "txt"."""
+    return "docx" if OUTPUT_FORMATS.get(os.path.splitext(template_path)[1].lower()) == "docx" else "txt"
+
+
+def output_format(output_path, template_path):
+    """Returns the format written to output_path: the one its extension names, else the template's own."""
+    return OUTPUT_FORMATS.get(os.path.splitext(output_path)[1].lower(), template_format(template_path))
+
+
+def _runs(paragraph):
+    """Returns the runs of a paragraph in document order, including those in hyperlinks but not in text boxes."""
+    return [run for run in paragraph.iter(W_R)
+            if run.getparent() is paragraph or next(run.iterancestors(W_P), None) is paragraph]
+
+
+def _run_text(run, properties=None):
+    """Returns a run's text; if a properties list is given, the run's w:rPr element (or None) is appended to it."""
+    parts = []
+    found = None
+    for child in run:
+        tag = child.tag
+        if tag == W_T:
+            parts.append(child.text or "")
+        elif tag == W_TAB:
+            parts.append("\t")
+        elif tag == W_BR or tag == W_CR:
+            parts.append("\n")
+        elif tag == W_RPR:
+            found = child
+    if properties is not None:
+        properties.append(found)
+    return "".join(parts)
+
+
+def _emphasis(properties):
+    """Returns the Markdown marker for a run's w:rPr: "**" for bold, "*" for italic, "***" for both."""
+    bold = italic = False
+    # Children are scanned directly; lxml's find() goes through ElementPath and is several times slower
+    for child in () if properties is None else properties:
+        if child.tag == W_B:
+            bold = child.get(W_VAL) not in OFF_VALUES
+        elif child.tag == W_I:
+            italic = child.get(W_VAL) not in OFF_VALUES
+    return ("**" if bold else "") + ("*" if italic else "")
+
+
+def paragraph_text(paragraph):
+    """Returns the plain text of a paragraph element, with tabs and line breaks kept."""
+    return "".join(_run_text(run) for run in _runs(paragraph))
+
+
+def paragraph_markdown(paragraph):
+    """Returns a paragraph as one Markdown block: headings, list items, and bold and italic runs are kept."""
+    pieces = []
+    found = []
+    for run in _runs(paragraph):
+        text = _run_text(run, found)
+        properties = found.pop()
+        if not text:
+            continue
+        marker = _emphasis(properties)
+        # Neighbouring runs with the same formatting are emphasised together
+        if pieces and pieces[-1][0] == marker:
+            pieces[-1][1].append(text)
+        else:
+            pieces.append((marker, [text]))
+    parts = []
+    for marker, texts in pieces:
+        text = "".join(texts).translate(MARKDOWN_ESCAPES)
+        stripped = text.strip()
+        if marker and stripped:
+            start = text.index(stripped)
+            parts.append(f"{text[:start]}{marker}{stripped}{marker[::-1]}{text[start + len(stripped):]}")
+        else:
+            parts.append(text)
+    line = "".join(parts).replace("\n", "  \n")
+    # w:pPr is always the first child of a paragraph when present
+    style = ""
+    if len(paragraph) and paragraph[0].tag == W_PPR:
+        for child in paragraph[0]:
+            if child.tag == W_PSTYLE:
+                style = child.get(W_VAL, "")
+                break
+    heading = HEADING_STYLE.fullmatch(style)
+    if heading or style == "Title":
+        return f"{'#' * (int(heading.group(1)) if heading else 1)} {line.strip()}" if line.strip() else ""
+    if style.startswith("ListBullet"):
+        return f"- {line}"
+    if style.startswith("ListNumber"):
+        return f"1. {line}"
+    return line
+
+
+def _cached(convert, cache, volatile):
+    """Wraps a paragraph converter so paragraphs outside volatile are converted once and then looked up in cache."""
+    if cache is None:
+        return convert
+
+    def lookup(paragraph):
+        if paragraph in volatile:
+            return convert(paragraph)
+        converted = cache.get(paragraph)
+        if converted is None:
+            converted = cache[paragraph] = convert(paragraph)
+        return converted
+    return lookup
+
+
+def _cell_texts(row, render):
+    return [" ".join(filter(None, (render(paragraph) for paragraph in cell.iter(W_P)))) for cell in row.iter(W_TC)]
+
+
+def document_text(body, cache=None, volatile=frozenset()):
+    """Returns the body of a document as plain text, one line per paragraph and tab-separated table rows.
+
+    A cache dict lets repeated conversions of the same document reuse the text of every paragraph
+    not in volatile, i.e. every paragraph that cannot have changed since the last call.
+    """
+    render = _cached(paragraph_text, cache, volatile)
+    lines = []
+    for block in body:
+        if block.tag == W_P:
+            lines.append(render(block))
+        elif block.tag == W_TBL:
+            lines.extend("\t".join(_cell_texts(row, render)) for row in block.iter(W_TR))
+    return "\n".join(lines) + "\n"
+
+
+def document_markdown(body, cache=None, volatile=frozenset()):
+    """Returns the body of a document as Markdown; empty paragraphs are dropped and tables become pipe tables.
+
+    cache and volatile work as for document_text.
+    """
+    render = _cached(paragraph_markdown, cache, volatile)
+    blocks = []
+    previous_item = False
+    for block in body:
+        if block.tag == W_P:
+            line = render(block)
+            if not line.strip():
+                continue
+            item = line.startswith(("- ", "1. "))
+            # Consecutive list items stay in one list rather than being separated by blank lines
+            if item and previous_item:
+                blocks[-1] += "\n" + line
+            else:
+                blocks.append(line)
+            previous_item = item
+        elif block.tag == W_TBL:
+            rows = [_cell_texts(row, render) for row in block.iter(W_TR)]
+            if rows:
+                width = max(len(row) for row in rows)
+                lines = [f"| {' | '.join(row + [''] * (width - len(row)))} |" for row in rows]
+                lines.insert(1, f"|{' --- |' * width}")
+                blocks.append("\n".join(lines))
+            previous_item = False
+    return "\n\n".join(blocks) + "\n"
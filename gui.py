@@ -1,9 +1,21 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
-import json
 import os
+import queue
+import threading
 from tkinter import ttk
-from utils import generate_document, load_config
+from preview import PreviewModel
+from resolver import resolve_placeholders
+from utils import generate_document, load_config, output_paths
+
+POLL_INTERVAL_MS = 100
+PREVIEW_DEBOUNCE_MS = 150
+
+loaded_config = {}
+render_messages = queue.Queue()
+cancel_render = threading.Event()
+render_results = []
+preview_state = {"model": None, "pending": None}
 
 
 def browse_config_file():
@@ -17,6 +29,7 @@ def browse_template_file():
     file_path = filedialog.askopenfilename(filetypes=[("Word files", "*.docx"), ("Text files", "*.txt")])
     if file_path:
         template_path.set(file_path)
+        schedule_preview()
 
 
 def load_config_file():
@@ -25,6 +38,11 @@ def load_config_file():
         messagebox.showerror("Error", "Config file not found.")
         return
     config = load_config(config_path_val)
+    if config is None:
+        messagebox.showerror("Error", "Config file could not be loaded.")
+        return
+    loaded_config.clear()
+    loaded_config.update(config)
     template_path.set(config.get("templateFilePath", ""))
     output_filename.set(config.get("outputFilePath", ""))
 
@@ -35,25 +53,175 @@ def load_config_file():
     placeholders = config.get("placeholders", {})
     for key, value in placeholders.items():
         listbox.insert(tk.END, f"{key}: {value}")
+    schedule_preview()
+
+
+def listbox_placeholders():
+    """Returns the placeholders currently shown in the listbox as a dict."""
+    placeholders = {}
+    for item in listbox.get(0, tk.END):
+        key, value = item.split(":", 1)
+        placeholders[key.strip()] = value.strip()
+    return placeholders
+
+
+def preview_values():
+    """Returns the listbox placeholders plus the one being edited in the entry fields."""
+    values = listbox_placeholders()
+    if placeholder_var.get().strip():
+        values[placeholder_var.get().strip()] = replace_with_var.get()
+    try:
+        return resolve_placeholders(values, loaded_config.get("bookends") or "%")
+    except ValueError:
+        # A reference cycle is likely mid-edit; preview the raw values until it is fixed
+        return values
+
+
+def schedule_preview(*_):
+    """Debounces preview refreshes so a burst of keystrokes triggers a single re-render."""
+    if preview_state["pending"] is not None:
+        root.after_cancel(preview_state["pending"])
+    preview_state["pending"] = root.after(PREVIEW_DEBOUNCE_MS, refresh_preview)
+
+
+def refresh_preview():
+    """Re-renders the preview pane, touching only the paragraphs whose placeholders changed."""
+    preview_state["pending"] = None
+    template_path_val = template_path.get()
+    bookend = loaded_config.get("bookends") or "%"
+    model = preview_state["model"]
+    preview_text.config(state=tk.NORMAL)
+    try:
+        if model is None or not model.is_current(template_path_val, bookend):
+            preview_text.delete("1.0", tk.END)
+            preview_state["model"] = None
+            if not template_path_val or not os.path.exists(template_path_val):
+                return
+            try:
+                model = preview_state["model"] = PreviewModel(template_path_val, bookend)
+            except Exception as e:
+                preview_text.insert(tk.END, f"Preview unavailable: {e}")
+                return
+            model.update(preview_values())
+            for index, text in enumerate(model.rendered):
+                preview_text.insert(tk.END, text + "\n", (f"p{index}",))
+            return
+        for index in model.update(preview_values()):
+            start, end = preview_text.tag_ranges(f"p{index}")
+            preview_text.delete(start, end)
+            preview_text.insert(start, model.rendered[index] + "\n", (f"p{index}",))
+    finally:
+        preview_text.config(state=tk.DISABLED)
 
 
 def generate_document_from_gui():
     template_path_val = template_path.get()
     output_filename_val = output_filename.get()
-    placeholders_text_val = placeholder_var.get()
 
-    if not template_path_val or not output_filename_val or not placeholders_text_val:
-        messagebox.showerror("Error", "All fields must be filled out.")
+    if not template_path_val or not output_filename_val:
+        messagebox.showerror("Error", "Template and output file must be filled out.")
         return
 
-    try:
-        placeholders = json.loads(placeholders_text_val)
-        generate_document(template_path_val, output_filename_val, placeholders)
-        messagebox.showinfo("Success", "Document generated successfully!")
-    except json.JSONDecodeError:
-        messagebox.showerror("Error", "Invalid JSON format in placeholders.")
-    except Exception as e:
-        messagebox.showerror("Error", f"An error occurred: {e}")
+    config = dict(loaded_config)
+    config.update({
+        "templateFilePath": template_path_val,
+        "outputFilePath": output_filename_val,
+        "placeholders": listbox_placeholders(),
+    })
+    start_render([config])
+
+
+def render_units(configs):
+    """Splits configs into one config per output file, the unit of progress and cancellation."""
+    units = []
+    for config in configs:
+        try:
+            paths = output_paths(config)
+        except ValueError:
+            # Left whole so generate_document reports the bad outputs entry
+            paths = [config.get("outputFilePath")]
+        if len(paths) == 1:
+            units.append(config)
+            continue
+        base = {key: value for key, value in config.items() if key != "outputs"}
+        units.extend(dict(base, outputFilePath=path) for path in paths)
+    return units
+
+
+def start_render(configs):
+    """Renders the given configs on a worker thread; results come back through render_messages."""
+    units = render_units(configs)
+    cancel_render.clear()
+    generate_button.config(state=tk.DISABLED)
+    cancel_button.config(state=tk.NORMAL if len(units) > 1 else tk.DISABLED)
+    if len(units) > 1:
+        progress_bar.config(mode="determinate", maximum=len(units), value=0)
+    else:
+        # A single output cannot report partial progress
+        progress_bar.config(mode="indeterminate", value=0)
+        progress_bar.start()
+    bookend = loaded_config.get("bookends") or "%"
+    threading.Thread(target=render_worker, args=(units, bookend), daemon=True).start()
+    root.after(POLL_INTERVAL_MS, poll_render)
+
+
+def render_worker(configs, bookend):
+    """Worker thread body. Never touches Tk: it only posts (kind, config, detail) messages."""
+    for config in configs:
+        if cancel_render.is_set():
+            break
+        try:
+            written = generate_document(config, bookend=bookend, interactive=False)
+            render_messages.put(("done" if written else "up to date", config, None))
+        except FileExistsError as e:
+            render_messages.put(("exists", config, e))
+        except Exception as e:
+            render_messages.put(("error", config, e))
+    render_messages.put(("finished", None, cancel_render.is_set()))
+
+
+def poll_render():
+    """Drains worker messages on the Tk thread, updating the progress bar until the worker finishes."""
+    while True:
+        try:
+            kind, config, detail = render_messages.get_nowait()
+        except queue.Empty:
+            root.after(POLL_INTERVAL_MS, poll_render)
+            return
+        if kind == "finished":
+            finish_render(cancelled=detail)
+            return
+        render_results.append((kind, config, detail))
+        if str(progress_bar["mode"]) == "determinate":
+            progress_bar["value"] = len(render_results)
+
+
+def finish_render(cancelled):
+    progress_bar.stop()
+    progress_bar.config(mode="determinate", value=0)
+    generate_button.config(state=tk.NORMAL)
+    cancel_button.config(state=tk.DISABLED)
+    results = list(render_results)
+    render_results.clear()
+    errors = [f"{config['outputFilePath']}: {detail}" for kind, config, detail in results if kind == "error"]
+    existing = [config for kind, config, _ in results if kind == "exists"]
+    written = sum(1 for kind, _, _ in results if kind == "done")
+    summary = f"{written} document(s) generated."
+    if cancelled:
+        summary += " Cancelled before all documents were written."
+    if errors:
+        messagebox.showerror("Error", summary + "\n\n" + "\n".join(errors))
+    elif existing and messagebox.askyesno(
+            "Overwrite?", f"{len(existing)} output file(s) already exist. Overwrite them?"):
+        start_render([dict(config, overwriteOutput=True) for config in existing])
+    else:
+        messagebox.showinfo("Success", summary)
+
+
+def cancel_generation():
+    """Asks the worker to stop after the output file it is currently writing."""
+    cancel_render.set()
+    cancel_button.config(state=tk.DISABLED)
 
 
 def add_placeholder():
@@ -116,6 +284,7 @@ def insert_placeholder():
 
 def run_gui():
     global config_path, template_path, output_filename, placeholder_var, replace_with_var, listbox
+    global root, progress_bar, generate_button, cancel_button, preview_text
 
     root = tk.Tk()
     root.title("Job Application Helper")
@@ -189,7 +358,22 @@ def run_gui():
 
     # Generate button
     generate_button = ttk.Button(root, text="Generate Document", command=generate_document_from_gui)
-    generate_button.grid(row=6, column=labelCol, columnspan=10, pady=10, sticky="ew")
+    generate_button.grid(row=6, column=labelCol, columnspan=buttonA, pady=10, sticky="ew")
+    cancel_button = ttk.Button(root, text="Cancel", command=cancel_generation, state=tk.DISABLED)
+    cancel_button.grid(row=6, column=buttonA, columnspan=4, padx=5, pady=10, sticky="ew")
+
+    # Render progress
+    progress_bar = ttk.Progressbar(root, mode="determinate")
+    progress_bar.grid(row=7, column=labelCol, columnspan=10, padx=5, pady=2, sticky="ew")
+
+    # Live preview of the rendered template
+    preview_label = ttk.Label(root, text="Preview:")
+    preview_label.grid(row=0, column=buttonB + buttonColumnspan, sticky=tk.W, padx=5, pady=2)
+    preview_text = tk.Text(root, width=60, height=20, wrap="word", state=tk.DISABLED)
+    preview_text.grid(row=1, column=buttonB + buttonColumnspan, rowspan=7, padx=5, pady=2, sticky="nsew")
+    for variable in (template_path, placeholder_var, replace_with_var):
+        variable.trace_add("write", schedule_preview)
 
     root.columnconfigure(textboxCol, weight=1)
+    root.columnconfigure(buttonB + buttonColumnspan, weight=1)
     root.mainloop()
@@ -0,0 +1,113 @@
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import tracing
+from scan import scan_placeholders
+
+INDEX_NAME = ".placeholder-index.json"
+TEMPLATE_EXTENSIONS = (".docx", ".txt")
+
+
+def _scan_template(task):
+    """Scans one template in a worker process; errors are recorded rather than raised."""
+    path, bookend = task
+    try:
+        with tracing.span("scan_template", path=path):
+            found = scan_placeholders(path, bookend)
+        tracing.count("placeholders_found", sum(entry["count"] for entry in found.values()))
+        return path, {name: entry["count"] for name, entry in found.items()}, None
+    except Exception as e:
+        return path, {}, str(e)
+
+
+class PlaceholderIndex:
+    """On-disk index of the placeholders used by every template under a directory.
+
+    Entries are keyed by path relative to the directory and remember each file's size and mtime,
+    so update() only re-parses templates that were added or changed since the last scan.
+    """
+
+    def __init__(self, directory, bookend="%"):
+        self.directory = os.path.abspath(directory)
+        self.bookend = bookend
+        self.path = os.path.join(self.directory, INDEX_NAME)
+        self.entries = {}
+        try:
+            with open(self.path, 'r') as f:
+                saved = json.load(f)
+            # An index built with other bookends found other placeholders, so it cannot be reused
+            if saved.get("bookend") == bookend:
+                self.entries = saved.get("templates", {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    def update(self, workers=None):
+        """Brings the index up to date with the directory tree and returns (scanned, reused, removed) counts."""
+        stale = []
+        seen = set()
+        for folder, folders, files in os.walk(self.directory):
+            folders[:] = [name for name in folders if not name.startswith(".")]
+            for name in files:
+                if not name.endswith(TEMPLATE_EXTENSIONS) or name.startswith(("~$", ".")):
+                    continue
+                path = os.path.join(folder, name)
+                relative = os.path.relpath(path, self.directory)
+                seen.add(relative)
+                stat = os.stat(path)
+                entry = self.entries.get(relative)
+                if entry is None or (entry["size"], entry["mtime_ns"]) != (stat.st_size, stat.st_mtime_ns):
+                    stale.append((relative, stat))
+        removed = [relative for relative in self.entries if relative not in seen]
+        for relative in removed:
+            del self.entries[relative]
+
+        tasks = [(os.path.join(self.directory, relative), self.bookend) for relative, _ in stale]
+        if len(tasks) > 1 and workers != 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=tracing.pool_initializer()) as executor:
+                results = [tracing.from_workers(result) for result in executor.map(
+                    tracing.for_workers(_scan_template), tasks, chunksize=max(1, len(tasks) // 64))]
+        else:
+            results = [_scan_template(task) for task in tasks]
+        for (relative, stat), (_, placeholders, error) in zip(stale, results):
+            self.entries[relative] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                                      "placeholders": placeholders, "error": error}
+        if stale or removed:
+            self.save()
+        return len(stale), len(seen) - len(stale), len(removed)
+
+    def save(self):
+        """Writes the index atomically next to the templates."""
+        handle, temporary_path = tempfile.mkstemp(prefix=".placeholder-index-", dir=self.directory)
+        try:
+            with os.fdopen(handle, 'w') as f:
+                json.dump({"bookend": self.bookend, "templates": self.entries}, f, indent=1, sort_keys=True)
+            os.replace(temporary_path, self.path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+
+    def templates_using(self, name):
+        """Returns the templates that contain the given placeholder, with how often they use it."""
+        return sorted((relative, entry["placeholders"][name]) for relative, entry in self.entries.items()
+                      if name in entry["placeholders"])
+
+    def placeholders_of(self, template_path):
+        """Returns a template's placeholder names, from the index when it is current, else by scanning it."""
+        path = os.path.abspath(template_path)
+        relative = os.path.relpath(path, self.directory)
+        entry = self.entries.get(relative)
+        if entry is not None and not relative.startswith(os.pardir):
+            stat = os.stat(path)
+            if (entry["size"], entry["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+                return list(entry["placeholders"])
+        return list(scan_placeholders(path, self.bookend))
+
+    def missing_placeholders(self, config):
+        """Returns the placeholders the config's template needs that the config does not fill in."""
+        provided = config.get("placeholders") or {}
+        return [name for name in self.placeholders_of(config["templateFilePath"]) if name not in provided]
+
+    def errors(self):
+        """Returns (template, error) pairs for templates that could not be scanned."""
+        return sorted((relative, entry["error"]) for relative, entry in self.entries.items() if entry.get("error"))
@@ -1,9 +1,10 @@
 import argparse
+import atexit
 import os
 from datetime import date
 import json
-from run_gui import run_gui
 from utils import generate_document, load_config, extract_placeholders, handle_external_program
+import tracing
 
 
 if __name__ == "__main__":
@@ -13,12 +14,145 @@ if __name__ == "__main__":
     parser.add_argument("-GUI", action="store_true", help="Load the GUI")
     parser.add_argument("-BUILD", help="Build config file from template."
                                        "Enter a path to a template file. (.docx, .doc, or .txt)", nargs='?')
+    parser.add_argument("--batch", help="Render one document per row of a .csv or .jsonl file, using --config "
+                                        "as the base config. Never prompts.")
+    parser.add_argument("--workers", type=int, help="Number of worker processes for --batch [Default is CPU count]")
+    parser.add_argument("--archive", metavar="ZIP",
+                        help="With --batch, write every document into this .zip, with a manifest.json, "
+                             "instead of separate files")
+    parser.add_argument("--report", help="Path of the per-row --batch report (.csv or .jsonl) "
+                                         "[Default is <rows>-report.csv]")
+    parser.add_argument("--index", metavar="DIR", help="Index the placeholders of every .docx/.txt template under "
+                                                        "DIR, re-parsing only changed files")
+    parser.add_argument("--needs", metavar="NAME", help="With --index, list the templates that use this placeholder")
+    parser.add_argument("--missing", metavar="CONFIG", help="With --index, list the placeholders CONFIG's template "
+                                                            "needs that CONFIG does not fill in")
+    parser.add_argument("--bookends", default="%", help="Placeholder bookends for --index [Default is %(default)s]")
+    parser.add_argument("--watch", nargs="+", metavar="CONFIG",
+                        help="Re-render each config's output whenever the config or its template changes. "
+                             "Never prompts; outputs are replaced.")
+    parser.add_argument("--poll", action="store_true", help="With --watch, poll for changes instead of using inotify")
+    parser.add_argument("--db", default="applications.db", help="Application store database [Default is "
+                                                                 "applications.db]")
+    parser.add_argument("--import", dest="import_configs", nargs="+", metavar="CONFIG",
+                        help="Import config JSON files into the application store")
+    parser.add_argument("--export", metavar="DIR", help="Export applications from the store as config JSON files "
+                                                        "(all, or those given with --app)")
+    parser.add_argument("--list", action="store_true", help="List applications in the store "
+                                                            "(filter with --company / --position)")
+    parser.add_argument("--company", help="Only list applications for this company")
+    parser.add_argument("--position", help="Only list applications for this position")
+    parser.add_argument("--app", type=int, nargs="+", metavar="ID",
+                        help="Render applications from the store by id (or select them for --export)")
+    parser.add_argument("--force", action="store_true",
+                        help="Regenerate outputs even if the build manifest says they are up to date")
+    parser.add_argument("--trace", help="Write per-stage timings and counters to this file in Chrome trace format "
+                                        "(open in chrome://tracing or Perfetto), including --batch and --index "
+                                        "worker processes")
     args = parser.parse_args()
+    if args.trace:
+        tracing.enable()
+        atexit.register(tracing.write_chrome_trace, args.trace)
     config_path = args.config if not None else input("Enter path to config file: ")
 
     if args.GUI:
+        from run_gui import run_gui
         run_gui()
 
+    elif args.watch:
+        from watch import watch
+        try:
+            watch(args.watch, polling=args.poll)
+        except KeyboardInterrupt:
+            print("Stopped watching.")
+        exit(0)
+
+    elif args.index:
+        from library_index import PlaceholderIndex
+        index = PlaceholderIndex(args.index, args.bookends)
+        scanned, reused, removed = index.update(workers=args.workers)
+        print(f"Indexed '{args.index}': {scanned} scanned, {reused} unchanged, {removed} removed.")
+        for template, error in index.errors():
+            print(f"Error scanning '{template}': {error}")
+        if args.needs:
+            print(f"Templates using '{args.needs}':")
+            for template, occurrences in index.templates_using(args.needs):
+                print(f"- {template} ({occurrences}x)")
+        if args.missing:
+            config = load_config(args.missing)
+            if config is None:
+                exit(1)
+            missing = index.missing_placeholders(config)
+            print(f"Placeholders missing from '{args.missing}':" if missing else
+                  f"'{args.missing}' fills in every placeholder of its template.")
+            for name in missing:
+                print(f"- {name}")
+        exit(0)
+
+    elif args.import_configs or args.export or args.list or args.app:
+        from store import ApplicationStore
+        failed = False
+        with ApplicationStore(args.db) as store:
+            for path in args.import_configs or []:
+                try:
+                    application_id, updated = store.import_config_file(path)
+                    print(f"{'Updated' if updated else 'Imported'} '{path}' as application {application_id}.")
+                except (FileNotFoundError, ValueError, TypeError, json.JSONDecodeError) as e:
+                    print(f"Error importing '{path}': {e}")
+                    failed = True
+            if args.export:
+                os.makedirs(args.export, exist_ok=True)
+                ids = args.app or [row[0] for row in store.find_applications()]
+                for application_id in ids:
+                    try:
+                        print(f"Exported application {application_id} to "
+                              f"'{store.export_config_file(application_id, args.export)}'.")
+                    except (FileExistsError, ValueError) as e:
+                        print(f"Error: {e}")
+                        failed = True
+            elif args.app:
+                for application_id in args.app:
+                    try:
+                        config = store.get_config(application_id)
+                        written = generate_document(application_id, bookend=config.get("bookends") or "%",
+                                                    interactive=False, store=store, force=args.force)
+                        print(f"Application {application_id}: "
+                              f"{'generated' if written else 'already up to date'} '{config['outputFilePath']}'.")
+                    except (FileNotFoundError, FileExistsError, ValueError, IOError) as e:
+                        print(f"Application {application_id}: error: {e}")
+                        failed = True
+            if args.list:
+                for application_id, company, position, applied, output_path in store.find_applications(
+                        company=args.company, position=args.position):
+                    print(f"{application_id:>6}  {company or '-'}  {position or '-'}  {applied or '-'}  {output_path}")
+        exit(1 if failed else 0)
+
+    elif args.batch:
+        if not args.config:
+            print("--batch requires --config with the template and output settings.")
+            exit(1)
+        from batch import run_batch, write_report
+        config = load_config(args.config)
+        if config is None:
+            exit(1)
+        report_path = args.report or os.path.splitext(args.batch)[0] + "-report.csv"
+        try:
+            results = run_batch(config, args.batch, workers=args.workers, bookend=config.get("bookends") or "%",
+                                force=args.force, archive_path=args.archive)
+        except (FileNotFoundError, FileExistsError, ValueError, json.JSONDecodeError) as e:
+            print(f"Error: {e}")
+            exit(1)
+        write_report(results, report_path)
+        failed = sum(1 for result in results if result["status"] == "error")
+        skipped = sum(1 for result in results if result["status"] == "skipped")
+        if args.archive:
+            print(f"Generated {len(results) - failed} of {len(results)} documents into '{args.archive}'. "
+                  f"Report written to '{report_path}'.")
+        else:
+            print(f"Generated {len(results) - failed - skipped} of {len(results)} documents, "
+                  f"{skipped} already up to date. Report written to '{report_path}'.")
+        exit(1 if failed else 0)
+
     elif args.BUILD:
         template_path = args.BUILD if args.BUILD else input("Enter path to template file: ")
         while not os.path.exists(template_path):
@@ -99,5 +233,7 @@ if __name__ == "__main__":
         else:
             print("Please enter a valid option y or n\n")
     #config = load_config(config_path if config_path else config_filepath)
-    generate_document(config, bookend=bookends)
-    print("Document generated successfully!")
+    if generate_document(config, bookend=bookends, force=args.force):
+        print("Document generated successfully!")
+    else:
+        print("Document is already up to date.")
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+import tempfile
+
+MANIFEST_NAME = ".build-manifest.json"
+
+# Config keys that change the bytes written, so changing them makes an output stale
+RENDER_OPTIONS = ("fastDocx", "keepCompression")
+
+_file_digests = {}
+
+
+def file_digest(path):
+    """Returns the SHA-256 of a file, reusing the last result while its size and mtime are unchanged."""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    key = (stat.st_size, stat.st_mtime_ns)
+    cached = _file_digests.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    _file_digests[path] = (key, digest.hexdigest())
+    return _file_digests[path][1]
+
+
+def input_digest(config, bookend):
+    """Hashes everything an output depends on: the template bytes, the placeholders, the bookend and render options."""
+    inputs = {
+        "template": file_digest(config["templateFilePath"]),
+        "placeholders": config.get("placeholders") or {},
+        "bookend": bookend,
+        "options": {key: config[key] for key in RENDER_OPTIONS if key in config},
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class BuildManifest:
+    """Records, next to a directory of outputs, the input digest each output was last built from."""
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, MANIFEST_NAME)
+        try:
+            with open(self.path, 'r') as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+
+    @classmethod
+    def for_output(cls, output_path):
+        return cls(os.path.dirname(os.path.abspath(output_path)))
+
+    def is_unmodified(self, output_path):
+        """Returns True if output_path exists and is exactly as this tool last built it, whatever from."""
+        entry = self.entries.get(os.path.basename(output_path))
+        if entry is None:
+            return False
+        try:
+            stat = os.stat(output_path)
+        except FileNotFoundError:
+            return False
+        return entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+
+    def is_up_to_date(self, output_path, digest):
+        """Returns True if output_path exists, is untouched since it was built and was built from digest."""
+        entry = self.entries.get(os.path.basename(output_path))
+        return entry is not None and entry["digest"] == digest and self.is_unmodified(output_path)
+
+    def record(self, output_path, digest):
+        """Records that output_path has just been built from digest."""
+        stat = os.stat(output_path)
+        self.entries[os.path.basename(output_path)] = {"digest": digest, "size": stat.st_size,
+                                                       "mtime_ns": stat.st_mtime_ns}
+
+    def save(self):
+        """Writes the manifest atomically, so an interrupted run never leaves it half written."""
+        directory = os.path.dirname(self.path)
+        handle, temporary_path = tempfile.mkstemp(prefix=".build-manifest-", dir=directory)
+        try:
+            with os.fdopen(handle, 'w') as f:
+                json.dump(self.entries, f, indent=4, sort_keys=True)
+            os.replace(temporary_path, self.path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
@@ -0,0 +1,66 @@
+import os
+from scan import iter_docx_paragraphs
+from substitution import placeholder_regex, substitute
+
+
+class PreviewModel:
+    """Rendered paragraph texts of a template, re-rendered incrementally as placeholder values change.
+
+    An index from each placeholder name to the paragraphs that use it means a changed value only
+    re-renders those paragraphs. .docx templates preview their main document text, one paragraph
+    per line; .txt templates preview line by line.
+    """
+
+    def __init__(self, template_path, bookend="%"):
+        self.template_path = template_path
+        self.bookend = bookend
+        self.mtime_ns = os.stat(template_path).st_mtime_ns
+        if template_path.endswith((".docx", ".doc")):
+            self.texts = [text for part, _, _, text in iter_docx_paragraphs(template_path)
+                          if part == "word/document.xml"]
+        elif template_path.endswith(".txt"):
+            with open(template_path, 'r', encoding='utf-8') as f:
+                self.texts = f.read().splitlines()
+        else:
+            raise ValueError("Unsupported file type. Please use .docx, .doc, or .txt.")
+        # Built lazily with the renderer's own matcher, so a stray bookend (e.g. "30%") cannot hide a placeholder
+        self.index = {}
+        self._candidates = [paragraph for paragraph, text in enumerate(self.texts) if bookend in text]
+        self.values = {}
+        self.rendered = list(self.texts)
+
+    def is_current(self, template_path, bookend):
+        """Returns True if the model still matches the given template file and bookend."""
+        try:
+            mtime_ns = os.stat(template_path).st_mtime_ns
+        except OSError:
+            return False
+        return (template_path, bookend, mtime_ns) == (self.template_path, self.bookend, self.mtime_ns)
+
+    def update(self, values):
+        """Applies a new set of placeholder values and returns the indices of the paragraphs that changed."""
+        changed_names = {name for name in set(values) | set(self.values) if values.get(name) != self.values.get(name)}
+        self.values = dict(values)
+        self._index_names(changed_names)
+        dirty = set()
+        for name in changed_names:
+            dirty.update(self.index.get(name, ()))
+        changed = []
+        for paragraph in sorted(dirty):
+            rendered = substitute(self.texts[paragraph], self.values, self.bookend)
+            if rendered != self.rendered[paragraph]:
+                self.rendered[paragraph] = rendered
+                changed.append(paragraph)
+        return changed
+
+    def _index_names(self, names):
+        """Records which paragraphs use each of the given placeholder names not indexed yet."""
+        names = frozenset(name for name in names if name not in self.index)
+        if not names:
+            return
+        for name in names:
+            self.index[name] = set()
+        pattern = placeholder_regex(names, self.bookend)
+        for paragraph in self._candidates:
+            for match in pattern.finditer(self.texts[paragraph]):
+                self.index[match.group(1)].add(paragraph)
@@ -0,0 +1,68 @@
+import functools
+import re
+
+
+@functools.lru_cache(maxsize=64)
+def reference_regex(names, bookend="%"):
+    """Builds one regex matching a reference to any of names, written as [Name] or {bookend}Name{bookend}."""
+    alternation = "|".join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+    return re.compile(rf"\[({alternation})\]|{re.escape(bookend)}({alternation}){re.escape(bookend)}")
+
+
+def find_references(value, names, bookend="%"):
+    """Returns the placeholder names a value refers to."""
+    return {match.group(1) or match.group(2) for match in reference_regex(frozenset(names), bookend).finditer(value)}
+
+
+def _find_cycle(graph, remaining):
+    """Returns one cycle, as a list of names, among the nodes Kahn's algorithm could not order."""
+    start = min(remaining)
+    path = [start]
+    seen = {start: 0}
+    while True:
+        following = min(name for name in graph[path[-1]] if name in remaining)
+        if following in seen:
+            return path[seen[following]:] + [following]
+        seen[following] = len(path)
+        path.append(following)
+
+
+def resolve_placeholders(placeholders, bookend="%"):
+    """Expands references between placeholder values, e.g. "[CompanyName]" inside RelatedSentence1.
+
+    References are parsed into a dependency graph, which is ordered topologically so that each
+    placeholder is expanded exactly once, after everything it refers to. Text in brackets that is
+    not a placeholder name, like "[industry/field]", is left alone. Raises ValueError if the
+    references form a cycle.
+    """
+    if not placeholders or not any("[" in value or bookend in value for value in placeholders.values()):
+        return dict(placeholders or {})
+    names = frozenset(placeholders)
+    pattern = reference_regex(names, bookend)
+    graph = {name: find_references(value, names, bookend) for name, value in placeholders.items()}
+
+    dependents = {name: [] for name in graph}
+    waiting = {}
+    for name, references in graph.items():
+        waiting[name] = len(references)
+        for reference in references:
+            dependents[reference].append(name)
+    ready = [name for name, count in waiting.items() if count == 0]
+    order = []
+    while ready:
+        name = ready.pop()
+        order.append(name)
+        for dependent in dependents[name]:
+            waiting[dependent] -= 1
+            if waiting[dependent] == 0:
+                ready.append(dependent)
+    if len(order) < len(graph):
+        cycle = _find_cycle(graph, set(graph).difference(order))
+        raise ValueError(f"Placeholder references form a cycle: {' -> '.join(cycle)}")
+
+    resolved = {}
+    for name in order:
+        value = placeholders[name]
+        resolved[name] = pattern.sub(lambda match: resolved[match.group(1) or match.group(2)], value) \
+            if graph[name] else value
+    return {name: resolved[name] for name in placeholders}
@@ -0,0 +1,101 @@
+import zipfile
+import xml.etree.ElementTree as ET
+from docx_runs import W_NS, is_text_part
+from substitution import token_regex
+
+_PARAGRAPH = W_NS + "p"
+_TEXT = W_NS + "t"
+_TABLE = W_NS + "tbl"
+_TEXT_BOX = W_NS + "txbxContent"
+# Word writes text box content twice, for DrawingML (mc:Choice) and VML (mc:Fallback) readers
+_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+
+
+def iter_docx_paragraphs(template_path):
+    """Streams the paragraphs of every text part of a .docx as (part, index, context, text).
+
+    Parts are read with an incremental parser and each paragraph is discarded once its text has
+    been rebuilt from its w:t nodes, so a token Word split across several runs is seen whole.
+    context is "body", "table" or "textbox"; a text box paragraph is yielded before the paragraph
+    that anchors it. Paragraphs inside mc:Fallback, the legacy copy of a text box, are skipped
+    but still numbered, so indexes follow the paragraphs of the part.
+    """
+    with zipfile.ZipFile(template_path) as package:
+        for name in package.namelist():
+            if not is_text_part(name):
+                continue
+            with package.open(name) as part:
+                index = 0
+                open_paragraphs = []
+                tables = 0
+                text_boxes = 0
+                fallbacks = 0
+                for event, element in ET.iterparse(part, events=("start", "end")):
+                    tag = element.tag
+                    if event == "start":
+                        if tag == _PARAGRAPH:
+                            if not fallbacks:
+                                context = "textbox" if text_boxes else "table" if tables else "body"
+                                open_paragraphs.append((index, context, []))
+                            index += 1
+                        elif tag == _FALLBACK:
+                            fallbacks += 1
+                        elif fallbacks:
+                            continue
+                        elif tag == _TABLE:
+                            tables += 1
+                        elif tag == _TEXT_BOX:
+                            text_boxes += 1
+                    elif fallbacks:
+                        if tag == _FALLBACK:
+                            fallbacks -= 1
+                            element.clear()
+                    elif tag == _TEXT:
+                        if open_paragraphs and element.text:
+                            open_paragraphs[-1][2].append(element.text)
+                    elif tag == _PARAGRAPH:
+                        paragraph_index, context, texts = open_paragraphs.pop()
+                        element.clear()
+                        yield name, paragraph_index, context, "".join(texts)
+                    elif tag == _TABLE:
+                        tables -= 1
+                        element.clear()
+                    elif tag == _TEXT_BOX:
+                        text_boxes -= 1
+
+
+def scan_placeholders(template_path, bookend="%"):
+    """Scans a template in one pass and reports every placeholder with its count and locations.
+
+    Returns a dict keyed by placeholder name, in order of first appearance, of
+    {"count": n, "locations": [...]}. A .docx location is {"part", "paragraph", "context"}; a .txt
+    location is {"line"}.
+    """
+    found = {}
+
+    def record(name, location):
+        name = name.strip()
+        if name:
+            entry = found.setdefault(name, {"count": 0, "locations": []})
+            entry["count"] += 1
+            entry["locations"].append(location)
+
+    if template_path.endswith((".docx", ".doc")):
+        pattern = token_regex(bookend)
+        for part, index, context, text in iter_docx_paragraphs(template_path):
+            if bookend not in text:
+                continue
+            for match in pattern.finditer(text):
+                record(match.group(1), {"part": part, "paragraph": index, "context": context})
+    elif template_path.endswith(".txt"):
+        with open(template_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        line = 1
+        position = 0
+        for match in token_regex(bookend, multiline=True).finditer(content):
+            line += content.count("\n", position, match.start())
+            position = match.start()
+            record(match.group(1), {"line": line})
+    else:
+        raise ValueError("Unsupported file type. Please use .docx, .doc, or .txt.")
+    return found
@@ -0,0 +1,189 @@
+import json
+import os
+import sqlite3
+
+DEFAULT_DB_PATH = "applications.db"
+
+# Config keys stored in their own columns; any other key round-trips through applications.extra
+_COLUMN_KEYS = ("configFileName", "templateFilePath", "bookends", "outputFilePath", "overwriteOutput", "placeholders")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS templates (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    bookends TEXT NOT NULL,
+    UNIQUE (path, bookends)
+);
+CREATE TABLE IF NOT EXISTS applications (
+    id INTEGER PRIMARY KEY,
+    template_id INTEGER NOT NULL REFERENCES templates (id),
+    config_name TEXT,
+    output_path TEXT NOT NULL,
+    overwrite INTEGER NOT NULL DEFAULT 0,
+    company TEXT,
+    position TEXT,
+    date TEXT,
+    extra TEXT NOT NULL DEFAULT '{}',
+    config_keys TEXT,
+    source_path TEXT
+);
+CREATE TABLE IF NOT EXISTS placeholder_values (
+    application_id INTEGER NOT NULL REFERENCES applications (id) ON DELETE CASCADE,
+    ordinal INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (application_id, name)
+);
+CREATE INDEX IF NOT EXISTS applications_company ON applications (company);
+CREATE INDEX IF NOT EXISTS applications_position ON applications (position);
+CREATE INDEX IF NOT EXISTS applications_date ON applications (date);
+CREATE INDEX IF NOT EXISTS applications_template ON applications (template_id);
+"""
+
+
+class ApplicationStore:
+    """SQLite store of applications, replacing one *-config.json file per job.
+
+    Each application keeps the fields of a config file: its template (shared between applications),
+    output settings and placeholder values. Company, position and date are taken from the
+    CompanyName, PositionName and Date placeholders and indexed for lookups. The keys the config had
+    are remembered, so get_config returns the same keys in the same order. Applications imported
+    from a config file remember its absolute path, so importing that file again updates them.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SCHEMA)
+        columns = {row["name"] for row in self.connection.execute("PRAGMA table_info(applications)")}
+        if "config_keys" not in columns:
+            # Databases created before config keys were recorded; their applications export every field
+            self.connection.execute("ALTER TABLE applications ADD COLUMN config_keys TEXT")
+        if "source_path" not in columns:
+            # Applications imported before source paths were recorded are never updated by a re-import
+            self.connection.execute("ALTER TABLE applications ADD COLUMN source_path TEXT")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS applications_source ON applications (source_path)")
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def _template_id(self, path, bookends):
+        row = self.connection.execute("SELECT id FROM templates WHERE path = ? AND bookends = ?",
+                                      (path, bookends)).fetchone()
+        if row is not None:
+            return row["id"]
+        return self.connection.execute("INSERT INTO templates (path, bookends) VALUES (?, ?)",
+                                       (path, bookends)).lastrowid
+
+    def _store(self, application_id, config, config_keys, source_path=None):
+        """Inserts (application_id None) or replaces an application and its placeholder values."""
+        if not isinstance(config, dict):
+            raise TypeError("Config must be a dictionary.")
+        placeholders = config.get("placeholders") or {}
+        extra = {key: value for key, value in config.items() if key not in _COLUMN_KEYS}
+        with self.connection:
+            template_id = self._template_id(config.get("templateFilePath", ""), config.get("bookends") or "%")
+            values = (template_id, config.get("configFileName"), config.get("outputFilePath", ""),
+                      int(bool(config.get("overwriteOutput", False))), placeholders.get("CompanyName"),
+                      placeholders.get("PositionName"), placeholders.get("Date"), json.dumps(extra),
+                      json.dumps(list(config_keys if config_keys is not None else config)), source_path)
+            if application_id is None:
+                application_id = self.connection.execute(
+                    "INSERT INTO applications (template_id, config_name, output_path, overwrite, company, position, "
+                    "date, extra, config_keys, source_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", values).lastrowid
+            else:
+                self.connection.execute(
+                    "UPDATE applications SET template_id = ?, config_name = ?, output_path = ?, overwrite = ?, "
+                    "company = ?, position = ?, date = ?, extra = ?, config_keys = ?, source_path = ? WHERE id = ?",
+                    values + (application_id,))
+                self.connection.execute("DELETE FROM placeholder_values WHERE application_id = ?", (application_id,))
+            self.connection.executemany(
+                "INSERT INTO placeholder_values (application_id, ordinal, name, value) VALUES (?, ?, ?, ?)",
+                [(application_id, ordinal, name, "" if value is None else str(value))
+                 for ordinal, (name, value) in enumerate(placeholders.items())])
+        return application_id
+
+    def add_application(self, config):
+        """Stores a config dict as a new application and returns its id."""
+        return self._store(None, config, None)
+
+    def import_config_file(self, config_path):
+        """Imports a config JSON file and returns (application id, True if an existing application was updated).
+
+        An application already imported from the same file (by absolute path) is updated rather than duplicated.
+        """
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+        if not isinstance(config, dict):
+            raise TypeError("Config must be a dictionary.")
+        config_keys = list(config)
+        config.setdefault("configFileName", os.path.basename(config_path))
+        source_path = os.path.realpath(config_path)
+        row = self.connection.execute("SELECT id FROM applications WHERE source_path = ? ORDER BY id LIMIT 1",
+                                      (source_path,)).fetchone()
+        application_id = row["id"] if row is not None else None
+        return self._store(application_id, config, config_keys, source_path), application_id is not None
+
+    def get_config(self, application_id):
+        """Returns an application as a config dict, the same shape as a config JSON file."""
+        row = self.connection.execute(
+            "SELECT a.*, t.path AS template_path, t.bookends FROM applications a "
+            "JOIN templates t ON t.id = a.template_id WHERE a.id = ?", (application_id,)).fetchone()
+        if row is None:
+            raise ValueError(f"No application with id {application_id} in '{self.db_path}'.")
+        placeholders = {value["name"]: value["value"] for value in self.connection.execute(
+            "SELECT name, value FROM placeholder_values WHERE application_id = ? ORDER BY ordinal",
+            (application_id,))}
+        config = {}
+        if row["config_name"]:
+            config["configFileName"] = row["config_name"]
+        config.update({
+            "templateFilePath": row["template_path"],
+            "outputFilePath": row["output_path"],
+            "overwriteOutput": bool(row["overwrite"]),
+            "bookends": row["bookends"],
+            "placeholders": placeholders,
+        })
+        config.update(json.loads(row["extra"]))
+        if row["config_keys"] is not None:
+            config = {key: config[key] for key in json.loads(row["config_keys"]) if key in config}
+        return config
+
+    def find_applications(self, company=None, position=None, date=None):
+        """Lists applications as (id, company, position, date, output path) rows, filtered on indexed columns."""
+        clauses = []
+        parameters = []
+        for column, value in (("company", company), ("position", position), ("date", date)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                parameters.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return [tuple(row) for row in self.connection.execute(
+            f"SELECT id, company, position, date, output_path FROM applications{where} ORDER BY id", parameters)]
+
+    def export_config_file(self, application_id, directory):
+        """Writes an application back out as a config JSON file in directory and returns its path.
+
+        Raises FileExistsError rather than overwriting an existing file.
+        """
+        config = self.get_config(application_id)
+        row = self.connection.execute("SELECT config_name FROM applications WHERE id = ?",
+                                      (application_id,)).fetchone()
+        config_name = row["config_name"] or f"application-{application_id}-config.json"
+        config_path = os.path.join(directory, config_name)
+        try:
+            outfile = open(config_path, 'x')
+        except FileExistsError:
+            raise FileExistsError(f"'{config_path}' already exists and will not be overwritten.")
+        with outfile:
+            json.dump(config, outfile, indent=4)
+        return config_path
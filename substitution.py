@@ -0,0 +1,81 @@
+import functools
+import re
+
+
+@functools.lru_cache(maxsize=64)
+def placeholder_regex(names, bookend="%"):
+    """Builds one compiled alternation matching any of the given placeholders between bookends.
+
+    Names are tried longest first so a placeholder that is a prefix of another never shadows it.
+    """
+    alternation = "|".join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+    return re.compile(rf"{re.escape(bookend)}({alternation}){re.escape(bookend)}")
+
+
+@functools.lru_cache(maxsize=16)
+def token_regex(bookend="%", multiline=False):
+    """Builds the regex matching any bookend-delimited token, used to discover placeholder names."""
+    return re.compile(rf"{re.escape(bookend)}(.*?){re.escape(bookend)}", re.DOTALL if multiline else 0)
+
+
+def substitute(text, placeholders, bookend="%"):
+    """Replaces every known placeholder in text in a single scan, building the result with one join."""
+    if not placeholders or bookend not in text:
+        return text
+    pattern = placeholder_regex(frozenset(placeholders), bookend)
+    parts = []
+    position = 0
+    for match in pattern.finditer(text):
+        parts.append(text[position:match.start()])
+        parts.append(placeholders[match.group(1)])
+        position = match.end()
+    if not parts:
+        return text
+    parts.append(text[position:])
+    return "".join(parts)
+
+
+def find_placeholders(text, bookend="%", multiline=False):
+    """Returns the placeholder names found in text, in order of first appearance."""
+    names = {}
+    for match in token_regex(bookend, multiline).finditer(text):
+        name = match.group(1).strip()
+        if name:
+            names[name] = None
+    return list(names)
+
+
+def substitute_stream(source, target, placeholders, bookend="%", chunk_size=1 << 20):
+    """Copies text from source to target, replacing placeholders chunk by chunk.
+
+    Memory stays bounded by chunk_size whatever the size of the input. The tail of each chunk that
+    could still be the start of a token is carried into the next one, so tokens crossing a chunk
+    boundary are replaced too. Returns the number of placeholders replaced.
+    """
+    if not placeholders:
+        for chunk in iter(lambda: source.read(chunk_size), ""):
+            target.write(chunk)
+        return 0
+    pattern = placeholder_regex(frozenset(placeholders), bookend)
+    # A match starting before the last (longest token - 1) characters is complete within the buffer
+    keep = max(len(name) for name in placeholders) + 2 * len(bookend) - 1
+    replaced = 0
+    carry = ""
+    while True:
+        chunk = source.read(chunk_size)
+        buffer = carry + chunk
+        limit = len(buffer) if not chunk else max(0, len(buffer) - keep)
+        position = 0
+        for match in pattern.finditer(buffer):
+            if match.start() >= limit:
+                break
+            target.write(buffer[position:match.start()])
+            target.write(placeholders[match.group(1)])
+            position = match.end()
+            replaced += 1
+        if not chunk:
+            target.write(buffer[position:])
+            return replaced
+        cut = max(position, limit)
+        target.write(buffer[position:cut])
+        carry = buffer[cut:]
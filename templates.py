@@ -0,0 +1,197 @@
+import functools
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from docx_runs import W_P, is_text_part, set_text, splice_runs, text_nodes
+from formats import document_markdown, document_text, output_format
+from substitution import placeholder_regex
+from tracing import count, span
+
+TEMPLATE_CACHE_SIZE = 32
+
+
+class CompiledTemplate:
+    """A template parsed once and rendered many times by filling in its slots.
+
+    Slots are (paragraph index, start, end, placeholder name) tuples recorded against the
+    paragraph text, so a render only rewrites the paragraphs that actually hold a placeholder.
+    For .docx templates only paragraphs containing the bookend are indexed, across the body,
+    tables, text boxes, headers and footers, and a render edits just the w:t nodes a slot
+    touches, so placeholders split over several runs are replaced and run formatting is kept.
+    """
+
+    def __init__(self, template_path, bookend="%"):
+        self.template_path = template_path
+        self.bookend = bookend
+        self._layouts = {}
+        self._lock = threading.Lock()
+        if template_path.endswith((".docx", ".doc")):
+            self.kind = "docx"
+            from docx import Document
+            with span("open_template", path=template_path):
+                self._document = Document(template_path)
+            self._paragraphs = []
+            self._nodes = []
+            self._runs = []
+            self._texts = []
+            for part in self._document.part.package.iter_parts():
+                if not is_text_part(str(part.partname).lstrip("/")):
+                    continue
+                for paragraph in part.element.iter(W_P):
+                    nodes = text_nodes(paragraph)
+                    runs = [node.text or "" for node in nodes]
+                    text = "".join(runs)
+                    if bookend in text:
+                        self._paragraphs.append(paragraph)
+                        self._nodes.append(nodes)
+                        self._runs.append(runs)
+                        self._texts.append(text)
+            self._filled = set()
+            # Text and Markdown conversions of paragraphs in their template state, for render_outputs
+            self._converted = {"txt": {}, "md": {}}
+        elif template_path.endswith(".txt"):
+            self.kind = "txt"
+            with span("open_template", path=template_path), open(template_path, 'r', encoding='utf-8') as f:
+                self._texts = [f.read()]
+        else:
+            raise ValueError("Unsupported file type. Please use .docx, .doc, or .txt.")
+        count("bytes_read", os.path.getsize(template_path))
+
+    def slots(self, names):
+        """Returns the slots for a set of placeholder names, computing them on first use."""
+        names = frozenset(names)
+        layout = self._layouts.get(names)
+        if layout is None:
+            layout = []
+            if names:
+                pattern = placeholder_regex(names, self.bookend)
+                for index, text in enumerate(self._texts):
+                    for match in pattern.finditer(text):
+                        layout.append((index, match.start(), match.end(), match.group(1)))
+            self._layouts[names] = layout
+        return layout
+
+    def fill(self, index, slots, placeholders):
+        """Returns the text of one paragraph with its slots filled in."""
+        text = self._texts[index]
+        parts = []
+        position = 0
+        for _, start, end, name in slots:
+            parts.append(text[position:start])
+            parts.append(placeholders[name])
+            position = end
+        parts.append(text[position:])
+        return "".join(parts)
+
+    def _slots_by_paragraph(self, placeholders):
+        by_paragraph = {}
+        slots = self.slots(placeholders)
+        for slot in slots:
+            by_paragraph.setdefault(slot[0], []).append(slot)
+        count("placeholders_replaced", len(slots))
+        return by_paragraph
+
+    def _substitute(self, by_paragraph, placeholders):
+        """Fills the slots of the parsed document in place; callers must hold the lock."""
+        with span("substitute"):
+            # Paragraphs filled by the previous render but not this one get their original runs back
+            for index in self._filled.difference(by_paragraph):
+                for node, text in zip(self._nodes[index], self._runs[index]):
+                    node.text = text
+            for index, paragraph_slots in by_paragraph.items():
+                spans = [(start, end, placeholders[name]) for _, start, end, name in paragraph_slots]
+                for node, old, new in zip(self._nodes[index], self._runs[index],
+                                          splice_runs(self._runs[index], spans)):
+                    if new != old or node.text != old:
+                        set_text(node, new)
+            self._filled = set(by_paragraph)
+
+    def render(self, placeholders, output_path):
+        """Fills the slots with the given placeholder values and writes the result to output_path.
+
+        output_path may also be a writable binary file object, such as an io.BytesIO.
+        """
+        by_paragraph = self._slots_by_paragraph(placeholders)
+
+        if self.kind == "txt":
+            with span("substitute"):
+                content = self.fill(0, by_paragraph.get(0, []), placeholders)
+            with span("save"):
+                _write_output(output_path, content)
+            return
+
+        with self._lock:
+            self._substitute(by_paragraph, placeholders)
+            with span("save"):
+                self._document.save(output_path)
+
+    def render_outputs(self, placeholders, output_paths, target=None):
+        """Renders once and writes the result to every output path, in the format its extension names.
+
+        .docx, .txt and .md outputs are supported; other extensions get the template's own format. A
+        .docx template is filled in a single pass, then serialized to each format in memory (text and
+        Markdown come from the document body), and the files are written concurrently. A .txt
+        template can only produce text and Markdown outputs, which both get the filled-in text as is.
+        With a target file object, the single output path only selects the format written to it.
+        """
+        formats = []
+        for output_path in output_paths:
+            formats.append(output_format(output_path, self.template_path))
+            if formats[-1] == "docx" and self.kind == "txt":
+                raise ValueError(f"A .txt template cannot be rendered to '{output_path}'.")
+        if target is not None:
+            output_paths = [target]
+        by_paragraph = self._slots_by_paragraph(placeholders)
+
+        if self.kind == "txt":
+            with span("substitute"):
+                content = self.fill(0, by_paragraph.get(0, []), placeholders)
+            contents = [content] * len(output_paths)
+        else:
+            contents = []
+            with self._lock:
+                self._substitute(by_paragraph, placeholders)
+                body = self._document.element.body
+                # Every paragraph not filled by this render is in its template state, so its conversion is reusable
+                volatile = {self._paragraphs[index] for index in self._filled}
+                for name in formats:
+                    with span("convert", format=name):
+                        if name == "docx":
+                            buffer = io.BytesIO()
+                            self._document.save(buffer)
+                            contents.append(buffer.getvalue())
+                        elif name == "txt":
+                            contents.append(document_text(body, self._converted["txt"], volatile))
+                        else:
+                            contents.append(document_markdown(body, self._converted["md"], volatile))
+
+        with span("save", outputs=len(output_paths)):
+            if len(output_paths) == 1:
+                _write_output(output_paths[0], contents[0])
+            else:
+                with ThreadPoolExecutor(max_workers=len(output_paths)) as executor:
+                    list(executor.map(_write_output, output_paths, contents))
+
+
+def _write_output(output_path, content):
+    """Writes bytes as is and text as UTF-8, to a path or to a binary file object."""
+    if hasattr(output_path, "write"):
+        output_path.write(content if isinstance(content, bytes) else content.encode('utf-8'))
+    elif isinstance(content, bytes):
+        with open(output_path, 'wb') as f:
+            f.write(content)
+    else:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _compile_template(template_path, mtime_ns, bookend):
+    return CompiledTemplate(template_path, bookend)
+
+
+def get_compiled_template(template_path, bookend="%"):
+    """Returns a cached CompiledTemplate, recompiling it when the file on disk has changed."""
+    template_path = os.path.abspath(template_path)
+    return _compile_template(template_path, os.stat(template_path).st_mtime_ns, bookend)
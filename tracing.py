@@ -0,0 +1,147 @@
+import functools
+import json
+import os
+import threading
+import time
+
+# None while tracing is off, so a disabled span or counter costs one global lookup
+_events = None
+_counters = None
+_lock = threading.Lock()
+# Counter totals as of the last drain(), so a worker sends each increment back once
+_drained_counters = {}
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter_ns()
+        event = {"name": self.name, "cat": "render", "ph": "X", "ts": self.start / 1000,
+                 "dur": (end - self.start) / 1000, "pid": os.getpid(), "tid": threading.get_ident()}
+        if self.args:
+            event["args"] = self.args
+        events = _events
+        if events is not None:
+            events.append(event)
+        return False
+
+    def set(self, **args):
+        """Attaches extra arguments to the span, e.g. sizes only known once the work is done."""
+        self.args.update(args)
+
+
+def enable():
+    """Starts recording spans and counters, discarding anything recorded before."""
+    global _events, _counters
+    _events = []
+    _counters = {}
+
+
+def disable():
+    """Stops recording."""
+    global _events, _counters
+    _events = None
+    _counters = None
+
+
+def is_enabled():
+    return _events is not None
+
+
+def span(name, **args):
+    """Returns a context manager timing one stage; a shared no-op object while tracing is off."""
+    if _events is None:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def count(name, value=1):
+    """Adds value to a named counter (placeholders found, bytes written...) while tracing is on."""
+    counters = _counters
+    if counters is None:
+        return
+    with _lock:
+        counters[name] = counters.get(name, 0) + value
+        total = counters[name]
+    _events.append({"name": name, "cat": "counter", "ph": "C", "ts": time.perf_counter_ns() / 1000,
+                    "pid": os.getpid(), "args": {name: total}})
+
+
+def counters():
+    """Returns a copy of the current counter totals."""
+    return dict(_counters or {})
+
+
+def drain():
+    """Returns and forgets the events recorded so far, with the counter increments since the last drain."""
+    global _events, _drained_counters
+    with _lock:
+        events, _events = _events, []
+        totals = dict(_counters)
+    increments = {name: total - _drained_counters.get(name, 0) for name, total in totals.items()}
+    _drained_counters = totals
+    return events, increments
+
+
+def merge(events, increments):
+    """Adds events and counter increments recorded in another process to this process's trace."""
+    _events.extend(events)
+    for name, value in increments.items():
+        if value:
+            count(name, value)
+
+
+def pool_initializer():
+    """Returns the initializer for a process pool: enable while tracing, so workers record too, else None."""
+    return enable if is_enabled() else None
+
+
+def _call_and_drain(function, argument):
+    result = function(argument)
+    return result, drain()
+
+
+def for_workers(function):
+    """Wraps a function run in pool workers so that, while tracing, it also returns the trace it recorded.
+
+    Results must be passed through from_workers in the parent; the wrapper can be pickled whenever
+    function can.
+    """
+    return functools.partial(_call_and_drain, function) if is_enabled() else function
+
+
+def from_workers(result):
+    """Unwraps the result of a for_workers function, merging the worker's trace into this process's."""
+    if not is_enabled():
+        return result
+    result, (events, increments) = result
+    merge(events, increments)
+    return result
+
+
+def write_chrome_trace(path):
+    """Writes the recorded events in the Chrome trace format (chrome://tracing, Perfetto)."""
+    with open(path, 'w') as f:
+        json.dump({"traceEvents": list(_events or []), "displayTimeUnit": "ms",
+                   "otherData": {"counters": counters()}}, f)
@@ -1,8 +1,16 @@
+import contextlib
+import io
 import json
 import os
-import re
 import subprocess
-from docx import Document
+from formats import OUTPUT_FORMATS, output_format, template_format
+from manifest import BuildManifest, input_digest
+from resolver import resolve_placeholders
+from substitution import substitute_stream
+from tracing import count, is_enabled, span
+
+# .txt templates larger than this are streamed in chunks instead of being compiled and cached
+TEXT_STREAM_THRESHOLD = 8 * 1024 * 1024
 
 
 def handle_external_program(config_filepath, program):
@@ -31,8 +39,65 @@ def handle_external_program(config_filepath, program):
     return load_config(config_filepath)
 
 
-def generate_document(config, bookend="%"):
-    """Generates a document from a template and placeholders."""
+def output_paths(config):
+    """Returns every file a config writes: outputFilePath first, then one file per extra format in outputs.
+
+    Extra formats are written next to outputFilePath under the same name, e.g. "outputs": ["txt", "md"]
+    with "Letter.docx" also writes "Letter.txt" and "Letter.md".
+    """
+    output_path = config.get("outputFilePath")
+    paths = [output_path]
+    stem, extension = os.path.splitext(output_path)
+    for name in config.get("outputs") or []:
+        name = str(name).lower().lstrip(".")
+        if name not in OUTPUT_FORMATS.values():
+            raise ValueError(f"Unsupported output format '{name}'. Please use docx, txt or md.")
+        if f".{name}" != extension.lower() and f"{stem}.{name}" not in paths:
+            paths.append(f"{stem}.{name}")
+    return paths
+
+
+@contextlib.contextmanager
+def _text_output(output):
+    """Opens an output path for writing text, or wraps a binary file object without closing it."""
+    if not hasattr(output, "write"):
+        with open(output, 'w', encoding='utf-8') as f:
+            yield f
+        return
+    wrapper = io.TextIOWrapper(output, encoding='utf-8')
+    try:
+        yield wrapper
+    finally:
+        wrapper.flush()
+        wrapper.detach()
+
+
+class _TeeWriter:
+    """Forwards every write to several text files, so one stream can fill them all."""
+
+    def __init__(self, files):
+        self.files = files
+
+    def write(self, text):
+        for f in self.files:
+            f.write(text)
+
+
+def generate_document(config, bookend="%", interactive=True, incremental=True, store=None, force=False,
+                      target=None):
+    """Generates a document from a config dict, or from the id of an application in store.
+
+    interactive allows prompting before overwriting; incremental skips outputs the build manifest
+    shows are up to date unless force is set; target is a binary file object to render into instead
+    of outputFilePath. Returns True if the document was written and False if it was up to date.
+    """
+    if isinstance(config, int) and not isinstance(config, bool):
+        if store is None:
+            from store import ApplicationStore
+            with ApplicationStore() as default_store:
+                config = default_store.get_config(config)
+        else:
+            config = store.get_config(config)
     while not isinstance(config, dict):
         raise TypeError("Config must be a dictionary.")
 
@@ -41,28 +106,69 @@ def generate_document(config, bookend="%"):
     placeholders = config.get("placeholders")
 
     try:
-        if os.path.exists(output_path):
-            if not config.get("overwriteOutput", False):  # Expects a boolean value
-                overwrite = input(
-                    f"Output file '{output_path}' already exists. Overwrite? (y/n): ").lower()  # Expects 'y' or 'n'
-                if overwrite != 'y':  # Only overwrite if user enters 'y'
-                    raise FileExistsError(f"Output file '{output_path}' already exists and overwrite is not allowed.")
-
-        if template_path.endswith((".docx", ".doc")):
-            doc = Document(template_path)
-            for paragraph in doc.paragraphs:
-                for placeholder, value in placeholders.items():
-                    paragraph.text = paragraph.text.replace(f"{bookend}{placeholder}{bookend}", value)
-            doc.save(output_path)
-        elif template_path.endswith(".txt"):
-            with open(template_path, 'r', encoding='utf-8') as f:
-                template_content = f.read()
-            for placeholder, value in placeholders.items():
-                template_content = template_content.replace(f"{placeholder}", value)
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(template_content)
-        else:
-            raise ValueError("Unsupported file type. Please use .docx, .doc, or .txt.")
+        paths = output_paths(config)
+        if target is not None:
+            if len(paths) > 1:
+                raise ValueError("Several output formats cannot be rendered into one target.")
+            incremental = False
+        if incremental:
+            digest = input_digest(config, bookend)
+            manifest = BuildManifest.for_output(output_path)
+            if not force and all(manifest.is_up_to_date(path, digest) for path in paths):
+                return False
+
+        for path in paths if target is None else []:
+            # A stale output this tool built and nobody has edited since is simply rebuilt
+            if os.path.exists(path) and not (incremental and manifest.is_unmodified(path)):
+                if not config.get("overwriteOutput", False):  # Expects a boolean value
+                    if not interactive:
+                        raise FileExistsError(f"Output file '{path}' already exists and overwrite is not allowed.")
+                    overwrite = input(
+                        f"Output file '{path}' already exists. Overwrite? (y/n): ").lower()  # Expects 'y' or 'n'
+                    if overwrite != 'y':  # Only overwrite if user enters 'y'
+                        raise FileExistsError(f"Output file '{path}' already exists and overwrite is not allowed.")
+
+        with span("resolve_placeholders"):
+            placeholders = resolve_placeholders(placeholders, bookend)
+
+        output = output_path if target is None else target
+        with span("generate_document", template=template_path, output=output_path) as stage:
+            if template_path.endswith(".txt") and os.path.getsize(template_path) > TEXT_STREAM_THRESHOLD:
+                # Text and Markdown outputs of a .txt template are the same text, so one stream fills them all
+                for path in paths:
+                    if output_format(path, template_path) == "docx":
+                        raise ValueError(f"A .txt template cannot be rendered to '{path}'.")
+                with open(template_path, 'r', encoding='utf-8') as source, contextlib.ExitStack() as outputs, \
+                        span("stream_substitute", outputs=len(paths)):
+                    text_outputs = [outputs.enter_context(_text_output(path)) for path in
+                                    (paths if target is None else [target])]
+                    writer = text_outputs[0] if len(text_outputs) == 1 else _TeeWriter(text_outputs)
+                    count("placeholders_replaced", substitute_stream(source, writer, placeholders, bookend))
+                    count("bytes_read", os.fstat(source.fileno()).st_size)
+            # Several outputs, or one in the other family (.docx vs text) than the template, are converted
+            elif len(paths) > 1 or \
+                    (output_format(output_path, template_path) == "docx") != (template_format(template_path) == "docx"):
+                from templates import get_compiled_template
+                get_compiled_template(template_path, bookend).render_outputs(placeholders, paths, target)
+            elif config.get("fastDocx", False) and template_path.endswith(".docx"):
+                from docx_zip import render_docx_zip
+                render_docx_zip(template_path, output, placeholders, bookend,
+                                keep_compression=config.get("keepCompression", True))
+            else:
+                # Imported on demand so that paths which never open a .docx never load python-docx or lxml
+                from templates import get_compiled_template
+                template = get_compiled_template(template_path, bookend)
+                template.render(placeholders, output)
+            if is_enabled():
+                written = sum(os.path.getsize(path) for path in paths) if target is None else target.tell()
+                count("bytes_written", written)
+                stage.set(bytes_written=written)
+
+        if incremental:
+            for path in paths:
+                manifest.record(path, digest)
+            manifest.save()
+        return True
 
     except FileNotFoundError:
         raise FileNotFoundError(f"Template file not found: {template_path}")
@@ -75,8 +181,10 @@ def generate_document(config, bookend="%"):
 def load_config(config_path):
     """Loads a JSON configuration file."""
     try:
-        with open(config_path, 'r') as f:
-            return json.load(f)
+        with span("load_config", path=config_path), open(config_path, 'r') as f:
+            config = json.load(f)
+            count("bytes_read", os.fstat(f.fileno()).st_size)
+            return config
     except (FileNotFoundError, json.JSONDecodeError, KeyError, IOError) as e:
         print(f"Error loading or processing config file: {e}")
     except Exception as e:
@@ -84,28 +192,16 @@ def load_config(config_path):
 
 
 def extract_placeholders(template_path, bookends):
-    """Extracts placeholders from a template file using specified bookends."""
-    placeholders = {}
+    """Extracts placeholders from a template file using specified bookends.
+
+    .docx templates are streamed part by part, covering headers, footers, tables and text boxes.
+    """
+    from scan import scan_placeholders
     try:
-        if template_path.endswith((".docx", ".doc")):
-            doc = Document(template_path)
-            for paragraph in doc.paragraphs:
-                matches = re.findall(rf"{re.escape(bookends)}(.*?){re.escape(bookends)}", paragraph.text)
-                for match in matches:
-                    placeholder_name = match.strip()
-                    if placeholder_name:
-                        placeholders[placeholder_name] = ""
-        elif template_path.endswith(".txt"):
-            with open(template_path, 'r', encoding='utf-8') as f:
-                file_content = f.read()
-                matches = re.findall(rf"{re.escape(bookends)}(.*?){re.escape(bookends)}", file_content, re.DOTALL)
-                for match in matches:
-                    placeholder_name = match.strip()
-                    if placeholder_name:
-                        placeholders[placeholder_name] = ""
-        else:
-            raise ValueError("Unsupported file type. Please use .docx, .doc, or .txt.")
-        return placeholders
+        with span("extract_placeholders", path=template_path):
+            found = scan_placeholders(template_path, bookends)
+        count("placeholders_found", sum(entry["count"] for entry in found.values()))
+        return {name: "" for name in found}
     except FileNotFoundError:
         raise FileNotFoundError(f"Template file not found: {template_path}")
     except Exception as e:
@@ -0,0 +1,180 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from utils import generate_document, load_config
+
+DEBOUNCE_SECONDS = 0.05
+POLL_INTERVAL_SECONDS = 0.25
+
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_WATCH_MASK = _IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _InotifyWatcher:
+    """Waits for changes with Linux inotify, watching the directories so editors' save-by-rename is seen."""
+
+    def __init__(self, paths):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths = set(paths)
+        self.directories = {}
+        for directory in {os.path.dirname(path) for path in self.paths}:
+            descriptor = libc.inotify_add_watch(self.fd, os.fsencode(directory), _WATCH_MASK)
+            if descriptor < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for '{directory}'")
+            self.directories[descriptor] = directory
+
+    def wait(self, timeout=None):
+        """Returns the watched paths changed within timeout seconds (an empty set if none)."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        changed = set()
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            descriptor, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += _EVENT_HEADER.size + length
+            path = os.path.join(self.directories.get(descriptor, ""), os.fsdecode(name))
+            if path in self.paths:
+                changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _PollingWatcher:
+    """Fallback watcher comparing file sizes and mtimes every poll interval."""
+
+    def __init__(self, paths, interval=POLL_INTERVAL_SECONDS):
+        self.paths = set(paths)
+        self.interval = interval
+        self.snapshot = self._take_snapshot()
+
+    def _take_snapshot(self):
+        snapshot = {}
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+                snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                snapshot[path] = None
+        return snapshot
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self._take_snapshot()
+            changed = {path for path in self.paths if current[path] != self.snapshot[path]}
+            self.snapshot = current
+            if changed:
+                return changed
+            if deadline is None:
+                time.sleep(self.interval)
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return set()
+            time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+
+def make_watcher(paths, polling=False):
+    """Returns an inotify watcher on Linux, or a polling watcher elsewhere or when polling is requested."""
+    paths = {os.path.abspath(path) for path in paths}
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return _InotifyWatcher(paths)
+        except (OSError, AttributeError):
+            pass
+    return _PollingWatcher(paths)
+
+
+def wait_for_changes(watcher, debounce=DEBOUNCE_SECONDS):
+    """Blocks until something changes, then keeps collecting until changes stop for debounce seconds.
+
+    A burst of writes, such as an editor saving through a temporary file, comes back as one set.
+    """
+    changed = watcher.wait()
+    while True:
+        more = watcher.wait(debounce)
+        if not more:
+            return changed
+        changed |= more
+
+
+class _WatchedConfig:
+    def __init__(self, config_path):
+        self.config_path = os.path.abspath(config_path)
+        self.config = None
+        self.template_path = None
+
+    def reload(self):
+        """Reloads the config; a config that does not parse (e.g. mid-save) keeps the previous one."""
+        config = load_config(self.config_path)
+        if isinstance(config, dict):
+            self.config = config
+            template_path = config.get("templateFilePath")
+            self.template_path = os.path.abspath(template_path) if template_path else None
+        return self.config is not None
+
+
+def render_watched(watched, report=print):
+    """Renders one watched config without prompting, replacing its previous output."""
+    config = dict(watched.config, overwriteOutput=True)
+    start = time.perf_counter()
+    try:
+        written = generate_document(config, bookend=config.get("bookends") or "%", interactive=False)
+        elapsed = (time.perf_counter() - start) * 1000
+        report(f"{'Rendered' if written else 'Up to date'}: '{config.get('outputFilePath')}' ({elapsed:.0f} ms)")
+    except Exception as e:
+        report(f"Error rendering '{watched.config_path}': {e}")
+
+
+def watch(config_paths, polling=False, debounce=DEBOUNCE_SECONDS, report=print):
+    """Re-renders the outputs of config_paths whenever a config or the template it uses changes.
+
+    Only the outputs depending on a changed file are rendered. The set of watched files is rebuilt
+    whenever a config starts pointing at a different template. Runs until interrupted.
+    """
+    watched = [_WatchedConfig(path) for path in config_paths]
+    for item in watched:
+        if item.reload():
+            render_watched(item, report)
+    while True:
+        paths = {item.config_path for item in watched} | {item.template_path for item in watched if item.template_path}
+        watcher = make_watcher(paths, polling)
+        report(f"Watching {len(paths)} file(s) for changes. Press Ctrl+C to stop.")
+        try:
+            while True:
+                changed = wait_for_changes(watcher, debounce)
+                templates_before = {item.template_path for item in watched}
+                for item in watched:
+                    if item.config_path in changed:
+                        item.reload()
+                    if item.config is not None and (item.config_path in changed or item.template_path in changed):
+                        render_watched(item, report)
+                if {item.template_path for item in watched} != templates_before:
+                    break
+        finally:
+            watcher.close()